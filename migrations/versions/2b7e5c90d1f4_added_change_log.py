@@ -0,0 +1,159 @@
+"""added change log
+
+Revision ID: 2b7e5c90d1f4
+Revises: 9d41e7c2a8f0
+Create Date: 2026-10-18 17:51:37.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7e5c90d1f4'
+down_revision: Union[str, None] = '9d41e7c2a8f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Up to 20 changes are sent in the payload as [seq, entity, action,
+# entity_id, employee_id, department_ids] arrays, well under the 8000 byte
+# limit. Larger statements only send their seq range, which listeners read
+# back from change_log.
+NOTIFY_FUNCTION = '''
+CREATE FUNCTION notify_changes(seqs bigint[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF seqs IS NULL THEN
+        RETURN;
+    ELSIF cardinality(seqs) <= 20 THEN
+        PERFORM pg_notify('emgmt_changes', json_build_object(
+            'events',
+            (SELECT json_agg(json_build_array(
+                        seq, entity, action, entity_id, employee_id,
+                        department_ids
+                    ) ORDER BY seq)
+             FROM change_log WHERE seq = ANY(seqs))
+        )::text);
+    ELSE
+        PERFORM pg_notify('emgmt_changes', json_build_object(
+            'first', (SELECT min(s) FROM unnest(seqs) AS s),
+            'last', (SELECT max(s) FROM unnest(seqs) AS s)
+        )::text);
+    END IF;
+END
+$$
+'''
+
+# For each table: the entity_id, employee_id and department_ids of a row
+# ``r``, and for updates of the new row ``r`` whose old version is ``o``.
+COLUMNS = {
+    'department': (
+        'r.id::text, NULL::uuid, ARRAY[r.id]',
+        'r.id::text, NULL::uuid, ARRAY[r.id]',
+    ),
+    'employee': (
+        'r.id::text, r.id, array_remove(ARRAY[r.department_id], NULL)',
+        'r.id::text, r.id, ARRAY(SELECT DISTINCT d FROM unnest(ARRAY['
+        'o.department_id, r.department_id]) AS d WHERE d IS NOT NULL)',
+    ),
+    'task': (
+        'r.id::text, r.employee_id, ARRAY(SELECT department_id '
+        'FROM employee WHERE id = r.employee_id '
+        'AND department_id IS NOT NULL)',
+        'r.id::text, r.employee_id, ARRAY(SELECT DISTINCT department_id '
+        'FROM employee WHERE id IN (o.employee_id, r.employee_id) '
+        'AND department_id IS NOT NULL)',
+    ),
+}
+
+LOG_INSERT = '''
+        WITH logged AS (
+            INSERT INTO change_log (
+                entity, action, entity_id, employee_id, department_ids
+            )
+            SELECT '{table}', '{action}', {columns}
+            FROM {rows}
+            RETURNING seq
+        )
+        SELECT array_agg(seq) INTO seqs FROM logged;'''
+
+
+def trigger_function(table: str) -> str:
+    row_columns, update_columns = COLUMNS[table]
+    insert = LOG_INSERT.format(
+        table=table, action='insert', columns=row_columns,
+        rows='new_rows AS r',
+    )
+    delete = LOG_INSERT.format(
+        table=table, action='delete', columns=row_columns,
+        rows='old_rows AS r',
+    )
+    # Updates that leave the row unchanged are not logged.
+    update = LOG_INSERT.format(
+        table=table, action='update', columns=update_columns,
+        rows='old_rows AS o JOIN new_rows AS r ON r.id = o.id '
+             'WHERE o IS DISTINCT FROM r',
+    )
+    return f'''
+CREATE FUNCTION change_log_{table}_changed()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    seqs bigint[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN{insert}
+    ELSIF TG_OP = 'DELETE' THEN{delete}
+    ELSE{update}
+    END IF;
+    PERFORM notify_changes(seqs);
+    RETURN NULL;
+END
+$$
+'''
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('change_log',
+    sa.Column('seq', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.String(), nullable=False),
+    sa.Column('employee_id', sa.UUID(), nullable=True),
+    sa.Column('department_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.execute(NOTIFY_FUNCTION)
+    for table in COLUMNS:
+        function = f'change_log_{table}_changed'
+        op.execute(trigger_function(table))
+        op.execute(
+            f'CREATE TRIGGER {function}_insert AFTER INSERT ON {table} '
+            f'REFERENCING NEW TABLE AS new_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION {function}()'
+        )
+        op.execute(
+            f'CREATE TRIGGER {function}_update AFTER UPDATE ON {table} '
+            f'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION {function}()'
+        )
+        op.execute(
+            f'CREATE TRIGGER {function}_delete AFTER DELETE ON {table} '
+            f'REFERENCING OLD TABLE AS old_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION {function}()'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COLUMNS:
+        function = f'change_log_{table}_changed'
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER {function}_{event} ON {table}')
+        op.execute(f'DROP FUNCTION {function}()')
+    op.execute('DROP FUNCTION notify_changes(bigint[])')
+    op.drop_table('change_log')
@@ -0,0 +1,47 @@
+"""added employee search indexes
+
+Revision ID: 3f9c1d7a52be
+Revises: e05e2413311f
+Create Date: 2026-10-18 11:03:54.118902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1d7a52be'
+down_revision: Union[str, None] = 'e05e2413311f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(op.f('ix_employee_age'), 'employee', ['age'], unique=False)
+    op.create_index(op.f('ix_employee_role'), 'employee', ['role'], unique=False)
+    op.create_index(op.f('ix_employee_salary'), 'employee', ['salary'], unique=False)
+    op.create_index(op.f('ix_employee_department_id'), 'employee', ['department_id'], unique=False)
+    for column in ('name', 'username', 'email'):
+        op.create_index(
+            f'ix_employee_{column}_trgm',
+            'employee',
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in ('name', 'username', 'email'):
+        op.drop_index(f'ix_employee_{column}_trgm', table_name='employee')
+    op.drop_index(op.f('ix_employee_department_id'), table_name='employee')
+    op.drop_index(op.f('ix_employee_salary'), table_name='employee')
+    op.drop_index(op.f('ix_employee_role'), table_name='employee')
+    op.drop_index(op.f('ix_employee_age'), table_name='employee')
@@ -0,0 +1,32 @@
+"""added task indexes
+
+Revision ID: 587a062b3b51
+Revises: c6b508f9b133
+Create Date: 2026-10-18 16:48:21.530774
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '587a062b3b51'
+down_revision: Union[str, None] = 'c6b508f9b133'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # employee.department_id is already indexed by 3f9c1d7a52be.
+    op.create_index('ix_task_employee_id_id', 'task', ['employee_id', 'id'], unique=False)
+    op.create_index('ix_task_open_employee_id_id', 'task', ['employee_id', 'id'], unique=False, postgresql_where=sa.text('NOT completed'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_open_employee_id_id', table_name='task', postgresql_where=sa.text('NOT completed'))
+    op.drop_index('ix_task_employee_id_id', table_name='task')
@@ -0,0 +1,415 @@
+"""added department summary
+
+Revision ID: c6b508f9b133
+Revises: 3f9c1d7a52be
+Create Date: 2026-10-18 16:12:40.305117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6b508f9b133'
+down_revision: Union[str, None] = '3f9c1d7a52be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Recounts the given departments, or all of them when passed NULL. Only
+# used to fill the table and to rebuild it by hand; the triggers below
+# apply deltas instead.
+REFRESH_FUNCTION = '''
+CREATE FUNCTION refresh_department_summary(department_ids integer[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO department_summary (department_id)
+    SELECT id FROM department
+    WHERE department_ids IS NULL OR id = ANY(department_ids)
+    ON CONFLICT (department_id) DO NOTHING;
+
+    PERFORM 1 FROM department_summary
+    WHERE department_ids IS NULL OR department_id = ANY(department_ids)
+    ORDER BY department_id
+    FOR UPDATE;
+
+    UPDATE department_summary AS summary
+    SET headcount = employees.headcount,
+        age_total = employees.age_total,
+        age_count = employees.age_count,
+        average_age = employees.average_age,
+        salary_count = employees.salary_count,
+        salary_total = employees.salary_total,
+        salary_average = employees.salary_average,
+        salary_min = employees.salary_min,
+        salary_max = employees.salary_max,
+        open_tasks = tasks.open_tasks,
+        completed_tasks = tasks.completed_tasks,
+        refreshed_at = now()
+    FROM department
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS headcount,
+               coalesce(sum(age), 0) AS age_total,
+               count(age) AS age_count,
+               round(avg(age), 2) AS average_age,
+               count(salary) AS salary_count,
+               sum(salary) AS salary_total,
+               round(avg(salary), 2) AS salary_average,
+               min(salary) AS salary_min,
+               max(salary) AS salary_max
+        FROM employee
+        WHERE employee.department_id = department.id
+    ) AS employees
+    CROSS JOIN LATERAL (
+        SELECT count(*) FILTER (WHERE NOT task.completed) AS open_tasks,
+               count(*) FILTER (WHERE task.completed) AS completed_tasks
+        FROM task
+        JOIN employee ON employee.id = task.employee_id
+        WHERE employee.department_id = department.id
+    ) AS tasks
+    WHERE summary.department_id = department.id
+      AND (department_ids IS NULL OR department.id = ANY(department_ids));
+END
+$$
+'''
+
+# What one statement changed in one department. A department can appear
+# more than once, e.g. as the old and the new side of an update.
+DELTA_TYPE = '''
+CREATE TYPE department_summary_delta AS (
+    department_id integer,
+    headcount bigint,
+    age_total bigint,
+    age_count bigint,
+    salary_total numeric,
+    salary_count bigint,
+    added_min numeric,
+    added_max numeric,
+    removed_min numeric,
+    removed_max numeric,
+    open_tasks bigint,
+    completed_tasks bigint
+)
+'''
+
+# Adds the deltas to the summary rows. The rows are locked in department
+# order so statements touching several departments cannot deadlock. The
+# minimum and maximum salary only have to be looked up again, on the
+# (department_id, salary) index, when a removed salary was one of them.
+APPLY_FUNCTION = '''
+CREATE FUNCTION apply_department_summary_deltas(
+    deltas department_summary_delta[]
+)
+RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+    department_ids integer[];
+BEGIN
+    SELECT array_agg(DISTINCT department_id) INTO department_ids
+    FROM unnest(deltas);
+    IF department_ids IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO department_summary (department_id)
+    SELECT unnest(department_ids)
+    ON CONFLICT (department_id) DO NOTHING;
+
+    PERFORM 1 FROM department_summary
+    WHERE department_id = ANY(department_ids)
+    ORDER BY department_id
+    FOR UPDATE;
+
+    UPDATE department_summary AS summary
+    SET headcount = summary.headcount + delta.headcount,
+        age_total = summary.age_total + delta.age_total,
+        age_count = summary.age_count + delta.age_count,
+        average_age = round(
+            (summary.age_total + delta.age_total)::numeric
+            / nullif(summary.age_count + delta.age_count, 0),
+            2
+        ),
+        salary_count = summary.salary_count + delta.salary_count,
+        salary_total = CASE
+            WHEN summary.salary_count + delta.salary_count > 0
+            THEN coalesce(summary.salary_total, 0) + delta.salary_total
+        END,
+        salary_average = round(
+            (coalesce(summary.salary_total, 0) + delta.salary_total)
+            / nullif(summary.salary_count + delta.salary_count, 0),
+            2
+        ),
+        salary_min = CASE
+            WHEN delta.removed_min <= summary.salary_min THEN NULL
+            ELSE least(summary.salary_min, delta.added_min)
+        END,
+        salary_max = CASE
+            WHEN delta.removed_max >= summary.salary_max THEN NULL
+            ELSE greatest(summary.salary_max, delta.added_max)
+        END,
+        open_tasks = summary.open_tasks + delta.open_tasks,
+        completed_tasks = summary.completed_tasks + delta.completed_tasks,
+        refreshed_at = now()
+    FROM (
+        SELECT department_id,
+               sum(headcount) AS headcount,
+               coalesce(sum(age_total), 0) AS age_total,
+               sum(age_count) AS age_count,
+               coalesce(sum(salary_total), 0) AS salary_total,
+               sum(salary_count) AS salary_count,
+               min(added_min) AS added_min,
+               max(added_max) AS added_max,
+               min(removed_min) AS removed_min,
+               max(removed_max) AS removed_max,
+               sum(open_tasks) AS open_tasks,
+               sum(completed_tasks) AS completed_tasks
+        FROM unnest(deltas)
+        GROUP BY department_id
+    ) AS delta
+    WHERE summary.department_id = delta.department_id;
+
+    UPDATE department_summary AS summary
+    SET salary_min = coalesce(
+            summary.salary_min,
+            (SELECT min(salary) FROM employee
+             WHERE employee.department_id = summary.department_id)
+        ),
+        salary_max = coalesce(
+            summary.salary_max,
+            (SELECT max(salary) FROM employee
+             WHERE employee.department_id = summary.department_id)
+        )
+    WHERE summary.department_id = ANY(department_ids)
+      AND summary.salary_count > 0
+      AND (summary.salary_min IS NULL OR summary.salary_max IS NULL);
+END
+$$
+'''
+
+# Statement level, so a bulk insert touches each department once. Updates
+# only count when a summarised column changed, and moving an employee to
+# another department takes their tasks along.
+EMPLOYEE_TRIGGER_FUNCTION = '''
+CREATE FUNCTION department_summary_employee_changed()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    deltas department_summary_delta[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(delta) INTO deltas FROM (
+            SELECT ROW(
+                department_id, count(*), sum(age), count(age),
+                sum(salary), count(salary), min(salary), max(salary),
+                NULL, NULL, 0, 0
+            )::department_summary_delta
+            FROM new_rows
+            WHERE department_id IS NOT NULL
+            GROUP BY department_id
+        ) AS grouped(delta);
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(delta) INTO deltas FROM (
+            SELECT ROW(
+                department_id, -count(*), -sum(age), -count(age),
+                -sum(salary), -count(salary), NULL, NULL,
+                min(salary), max(salary), 0, 0
+            )::department_summary_delta
+            FROM old_rows
+            WHERE department_id IS NOT NULL
+            GROUP BY department_id
+        ) AS grouped(delta);
+    ELSE
+        WITH changed AS (
+            SELECT new_rows.id,
+                   old_rows.department_id AS old_department_id,
+                   old_rows.age AS old_age,
+                   old_rows.salary AS old_salary,
+                   new_rows.department_id AS new_department_id,
+                   new_rows.age AS new_age,
+                   new_rows.salary AS new_salary
+            FROM old_rows
+            JOIN new_rows ON new_rows.id = old_rows.id
+            WHERE (old_rows.department_id, old_rows.salary, old_rows.age)
+                  IS DISTINCT FROM
+                  (new_rows.department_id, new_rows.salary, new_rows.age)
+        ), moved AS (
+            SELECT changed.*,
+                   coalesce(tasks.open_tasks, 0) AS open_tasks,
+                   coalesce(tasks.completed_tasks, 0) AS completed_tasks
+            FROM changed
+            LEFT JOIN LATERAL (
+                SELECT count(*) FILTER (WHERE NOT completed) AS open_tasks,
+                       count(*) FILTER (WHERE completed) AS completed_tasks
+                FROM task
+                WHERE task.employee_id = changed.id
+                  AND changed.old_department_id
+                      IS DISTINCT FROM changed.new_department_id
+            ) AS tasks ON true
+        )
+        SELECT array_agg(delta) INTO deltas FROM (
+            SELECT ROW(
+                old_department_id, -count(*), -sum(old_age),
+                -count(old_age), -sum(old_salary), -count(old_salary),
+                NULL, NULL, min(old_salary), max(old_salary),
+                -sum(open_tasks), -sum(completed_tasks)
+            )::department_summary_delta
+            FROM moved
+            WHERE old_department_id IS NOT NULL
+            GROUP BY old_department_id
+            UNION ALL
+            SELECT ROW(
+                new_department_id, count(*), sum(new_age), count(new_age),
+                sum(new_salary), count(new_salary), min(new_salary),
+                max(new_salary), NULL, NULL,
+                sum(open_tasks), sum(completed_tasks)
+            )::department_summary_delta
+            FROM moved
+            WHERE new_department_id IS NOT NULL
+            GROUP BY new_department_id
+        ) AS grouped(delta);
+    END IF;
+    PERFORM apply_department_summary_deltas(deltas);
+    RETURN NULL;
+END
+$$
+'''
+
+TASK_TRIGGER_FUNCTION = '''
+CREATE FUNCTION department_summary_task_changed()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    deltas department_summary_delta[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(delta) INTO deltas FROM (
+            SELECT ROW(
+                employee.department_id, 0, 0, 0, 0, 0, NULL, NULL, NULL,
+                NULL,
+                count(*) FILTER (WHERE NOT new_rows.completed),
+                count(*) FILTER (WHERE new_rows.completed)
+            )::department_summary_delta
+            FROM new_rows
+            JOIN employee ON employee.id = new_rows.employee_id
+            WHERE employee.department_id IS NOT NULL
+            GROUP BY employee.department_id
+        ) AS grouped(delta);
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(delta) INTO deltas FROM (
+            SELECT ROW(
+                employee.department_id, 0, 0, 0, 0, 0, NULL, NULL, NULL,
+                NULL,
+                -count(*) FILTER (WHERE NOT old_rows.completed),
+                -count(*) FILTER (WHERE old_rows.completed)
+            )::department_summary_delta
+            FROM old_rows
+            JOIN employee ON employee.id = old_rows.employee_id
+            WHERE employee.department_id IS NOT NULL
+            GROUP BY employee.department_id
+        ) AS grouped(delta);
+    ELSE
+        WITH changed AS (
+            SELECT old_rows.employee_id AS old_employee_id,
+                   old_rows.completed AS old_completed,
+                   new_rows.employee_id AS new_employee_id,
+                   new_rows.completed AS new_completed
+            FROM old_rows
+            JOIN new_rows ON new_rows.id = old_rows.id
+            WHERE (old_rows.completed, old_rows.employee_id)
+                  IS DISTINCT FROM (new_rows.completed, new_rows.employee_id)
+        )
+        SELECT array_agg(delta) INTO deltas FROM (
+            SELECT ROW(
+                employee.department_id, 0, 0, 0, 0, 0, NULL, NULL, NULL,
+                NULL,
+                -count(*) FILTER (WHERE NOT changed.old_completed),
+                -count(*) FILTER (WHERE changed.old_completed)
+            )::department_summary_delta
+            FROM changed
+            JOIN employee ON employee.id = changed.old_employee_id
+            WHERE employee.department_id IS NOT NULL
+            GROUP BY employee.department_id
+            UNION ALL
+            SELECT ROW(
+                employee.department_id, 0, 0, 0, 0, 0, NULL, NULL, NULL,
+                NULL,
+                count(*) FILTER (WHERE NOT changed.new_completed),
+                count(*) FILTER (WHERE changed.new_completed)
+            )::department_summary_delta
+            FROM changed
+            JOIN employee ON employee.id = changed.new_employee_id
+            WHERE employee.department_id IS NOT NULL
+            GROUP BY employee.department_id
+        ) AS grouped(delta);
+    END IF;
+    PERFORM apply_department_summary_deltas(deltas);
+    RETURN NULL;
+END
+$$
+'''
+
+TRIGGERS = [
+    ('employee', 'department_summary_employee_changed'),
+    ('task', 'department_summary_task_changed'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('department_summary',
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    sa.Column('headcount', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('age_total', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('age_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('average_age', sa.Numeric(precision=5, scale=2), nullable=True),
+    sa.Column('salary_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('salary_total', sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column('salary_average', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('salary_min', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('salary_max', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('open_tasks', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('completed_tasks', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['department_id'], ['department.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('department_id')
+    )
+    op.create_index('ix_employee_department_id_salary', 'employee', ['department_id', 'salary'], unique=False)
+    op.execute(REFRESH_FUNCTION)
+    op.execute(DELTA_TYPE)
+    op.execute(APPLY_FUNCTION)
+    op.execute(EMPLOYEE_TRIGGER_FUNCTION)
+    op.execute(TASK_TRIGGER_FUNCTION)
+    # Transition tables need one trigger per event.
+    for table, function in TRIGGERS:
+        op.execute(
+            f'CREATE TRIGGER {function}_insert AFTER INSERT ON {table} '
+            f'REFERENCING NEW TABLE AS new_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION {function}()'
+        )
+        op.execute(
+            f'CREATE TRIGGER {function}_update AFTER UPDATE ON {table} '
+            f'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION {function}()'
+        )
+        op.execute(
+            f'CREATE TRIGGER {function}_delete AFTER DELETE ON {table} '
+            f'REFERENCING OLD TABLE AS old_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION {function}()'
+        )
+    op.execute('SELECT refresh_department_summary(NULL)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, function in TRIGGERS:
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER {function}_{event} ON {table}')
+        op.execute(f'DROP FUNCTION {function}()')
+    op.execute(
+        'DROP FUNCTION '
+        'apply_department_summary_deltas(department_summary_delta[])'
+    )
+    op.execute('DROP TYPE department_summary_delta')
+    op.execute('DROP FUNCTION refresh_department_summary(integer[])')
+    op.drop_index('ix_employee_department_id_salary', table_name='employee')
+    op.drop_table('department_summary')
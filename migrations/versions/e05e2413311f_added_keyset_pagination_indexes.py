@@ -0,0 +1,31 @@
+"""added keyset pagination indexes
+
+Revision ID: e05e2413311f
+Revises: 8b73826faeda
+Create Date: 2026-10-18 10:12:31.402215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e05e2413311f'
+down_revision: Union[str, None] = '8b73826faeda'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_department_name_id', 'department', ['name', 'id'], unique=False)
+    op.create_index('ix_employee_name_id', 'employee', ['name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_employee_name_id', table_name='employee')
+    op.drop_index('ix_department_name_id', table_name='department')
@@ -0,0 +1,179 @@
+"""Live change notifications for websocket clients on every replica.
+
+Writers publish change events to one Redis channel. Each replica holds a
+single subscription to it and fans the events out to its own websocket
+clients that subscribed to any of the event's topics, such as
+``department:3`` or ``employee:<uuid>``. Events only name what changed;
+clients fetch the data through the authorised REST endpoints.
+
+Every client has a bounded queue. When it fills up, the queued events are
+coalesced into one ``resync`` message listing their topics; a client that
+is still behind when the next overflow comes is disconnected.
+"""
+
+import asyncio
+from contextlib import suppress
+import json
+import logging
+import re
+from uuid import UUID
+
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.emgmt.cache import REDIS_URL, redis_client
+from src.emgmt.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "emgmt:changes"
+
+TOPIC = re.compile(
+    r"^(department:\d+|employee:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}"
+    r"-[0-9a-f]{4}-[0-9a-f]{12})$"
+)
+
+
+def change_event(
+    entity: str,
+    action: str,
+    entity_id: int | UUID | None = None,
+    department_ids: list[int | None] = (),
+    employee_ids: list[UUID | None] = (),
+) -> dict:
+    topics = {f"department:{i}" for i in department_ids if i is not None}
+    topics.update(f"employee:{i}" for i in employee_ids if i is not None)
+    return {
+        "entity": entity,
+        "action": action,
+        "id": None if entity_id is None else str(entity_id),
+        "topics": sorted(topics),
+    }
+
+
+class Subscriber:
+    def __init__(self, topics: set[str], queue_size: int):
+        self.topics = topics
+        # None is queued last for a client that must be disconnected
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(queue_size)
+        self.resync_pending = False
+
+    def _drain(self) -> set[str]:
+        topics = set()
+        while not self.queue.empty():
+            topics.update(json.loads(self.queue.get_nowait())["topics"])
+        return topics
+
+    def offer(self, message: str, topics: list[str]) -> str | None:
+        """Queue a message; returns "coalesced" or "dropped" on overflow."""
+        try:
+            self.queue.put_nowait(message)
+            return None
+        except asyncio.QueueFull:
+            pass
+        stale = self._drain() | set(topics)
+        if self.resync_pending:
+            self.queue.put_nowait(None)
+            return "dropped"
+        self.queue.put_nowait(
+            json.dumps(
+                {"action": "resync", "topics": sorted(stale & self.topics)}
+            )
+        )
+        self.resync_pending = True
+        return "coalesced"
+
+    async def next_message(self) -> str | None:
+        message = await self.queue.get()
+        if self.queue.empty():
+            self.resync_pending = False
+        return message
+
+
+class BroadcastHub:
+    def __init__(self, redis: Redis, queue_size: int):
+        self.redis = redis
+        self.queue_size = queue_size
+        self.subscribers: set[Subscriber] = set()
+        self.coalesced = 0
+        self.dropped = 0
+        self._listener: asyncio.Task | None = None
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.subscribers),
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+    def connect(self, topics: set[str]) -> Subscriber:
+        subscriber = Subscriber(topics, self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    async def publish(self, event: dict) -> None:
+        if not event["topics"]:
+            return
+        try:
+            await self.redis.publish(CHANNEL, json.dumps(event))
+        except RedisError:
+            logger.warning("Could not publish %s change", event["entity"])
+
+    def deliver(self, message: str) -> None:
+        topics = json.loads(message)["topics"]
+        for subscriber in list(self.subscribers):
+            if subscriber.topics.isdisjoint(topics):
+                continue
+            outcome = subscriber.offer(message, topics)
+            if outcome == "coalesced":
+                self.coalesced += 1
+            elif outcome == "dropped":
+                self.dropped += 1
+                self.subscribers.discard(subscriber)
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.deliver(message["data"])
+            except RedisError:
+                logger.warning("Broadcast hub lost its Redis subscription")
+            await asyncio.sleep(1)
+
+    def start(self) -> None:
+        self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+
+_sync_redis: SyncRedis | None = None
+
+
+def publish_sync(event: dict) -> None:
+    """Publish from blocking code such as the CLI."""
+    global _sync_redis
+    if not event["topics"]:
+        return
+    if _sync_redis is None:
+        _sync_redis = SyncRedis.from_url(
+            REDIS_URL, socket_connect_timeout=1, socket_timeout=1
+        )
+    try:
+        _sync_redis.publish(CHANNEL, json.dumps(event))
+    except RedisError:
+        logger.warning("Could not publish %s change", event["entity"])
+
+
+change_hub = BroadcastHub(redis_client, settings.BROADCAST_QUEUE_SIZE)
@@ -0,0 +1,274 @@
+"""Bulk employee import.
+
+Rows are streamed from a CSV or JSONL file and validated in batches. Each
+batch is COPYed into a temporary staging table, where username/email
+uniqueness and department references are checked with set-based queries
+before the surviving rows are inserted into ``employee``. Rejected rows are
+reported one by one through a callback, so memory use does not depend on
+the size of the file.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from dataclasses import dataclass
+import io
+from itertools import islice
+import json
+from typing import BinaryIO, Callable, Iterator
+from uuid import uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.emgmt.config import settings
+from src.emgmt.database import engine
+from src.emgmt.schemas import EmployeeImport
+from src.emgmt.utils import hash_password
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+STAGING_COLUMNS = (
+    "line",
+    "id",
+    "name",
+    "age",
+    "username",
+    "email",
+    "hashed_password",
+    "salary",
+    "department_id",
+)
+
+CREATE_STAGING_TABLE = text("""
+    CREATE TEMP TABLE employee_import (
+        line integer PRIMARY KEY,
+        id uuid NOT NULL,
+        name varchar NOT NULL,
+        age integer,
+        username varchar NOT NULL,
+        email varchar NOT NULL,
+        hashed_password varchar,
+        salary numeric(10, 2),
+        department_id integer,
+        error varchar
+    ) ON COMMIT DROP
+    """)
+
+# Messages match the 409s returned by POST /employees/.
+FLAG_REJECTED_ROWS = text("""
+    UPDATE employee_import AS s
+    SET error = CASE
+        WHEN s.department_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM department AS d WHERE d.id = s.department_id
+        ) THEN 'Invalid department id entered.'
+        WHEN r.username_rank > 1 OR EXISTS (
+            SELECT 1 FROM employee AS e WHERE e.username = s.username
+        ) THEN 'Username is already in use.'
+        WHEN r.email_rank > 1 OR EXISTS (
+            SELECT 1 FROM employee AS e WHERE e.email = s.email
+        ) THEN 'Email is already in use.'
+    END
+    FROM (
+        SELECT
+            line,
+            row_number() OVER (
+                PARTITION BY username ORDER BY line
+            ) AS username_rank,
+            row_number() OVER (
+                PARTITION BY email ORDER BY line
+            ) AS email_rank
+        FROM employee_import
+    ) AS r
+    WHERE r.line = s.line
+    """)
+
+SELECT_REJECTED_ROWS = text("""
+    SELECT line, error FROM employee_import
+    WHERE error IS NOT NULL
+    ORDER BY line
+    """)
+
+INSERT_ACCEPTED_ROWS = text("""
+    INSERT INTO employee (
+        id, name, age, username, email, hashed_password, role, salary,
+        department_id
+    )
+    SELECT
+        id, name, age, username, email, hashed_password, 'employee', salary,
+        department_id
+    FROM employee_import
+    WHERE error IS NULL
+    ON CONFLICT DO NOTHING
+    """)
+
+# Rows that passed the checks but lost a race with a concurrent insert.
+SELECT_CONFLICTING_ROWS = text("""
+    SELECT s.line FROM employee_import AS s
+    WHERE s.error IS NULL
+    AND NOT EXISTS (SELECT 1 FROM employee AS e WHERE e.id = s.id)
+    ORDER BY s.line
+    """)
+
+
+@dataclass
+class ImportSummary:
+    total: int = 0
+    inserted: int = 0
+    rejected: int = 0
+
+
+def detect_format(filename: str | None) -> str:
+    for extension, file_format in FORMATS.items():
+        if filename and filename.lower().endswith(extension):
+            return file_format
+    raise ValueError(
+        "Cannot tell the file format from its name; pass csv or jsonl."
+    )
+
+
+def read_rows(file: BinaryIO, file_format: str) -> Iterator[tuple[int, dict]]:
+    """Yield ``(line number, row)`` pairs; unparseable rows come as None."""
+    text_file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    if file_format == "csv":
+        reader = csv.DictReader(text_file)
+        for row in reader:
+            # Empty cells fall back to the schema defaults.
+            yield reader.line_num, {
+                key: value
+                for key, value in row.items()
+                if key is not None and value != ""
+            }
+        return
+
+    for line_number, line in enumerate(text_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _batches(rows: Iterator, size: int) -> Iterator[list]:
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _validate(row: dict | None) -> tuple[EmployeeImport | None, str | None]:
+    if row is None:
+        return None, "Row is not a JSON object."
+    try:
+        return EmployeeImport.model_validate(row), None
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+            for error in e.errors()
+        )
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _load_batch(
+    connection: Connection,
+    staged: list[tuple[int, EmployeeImport, str | None]],
+    on_error: Callable[[int, str], None],
+) -> tuple[int, int]:
+    buffer = io.StringIO()
+    for line, employee, hashed_password in staged:
+        values = (
+            line,
+            uuid4(),
+            employee.name,
+            employee.age,
+            employee.username,
+            employee.email,
+            hashed_password,
+            employee.salary,
+            employee.department_id,
+        )
+        buffer.write("\t".join(map(_copy_value, values)) + "\n")
+    buffer.seek(0)
+
+    rejected = 0
+    with connection.begin():
+        connection.execute(CREATE_STAGING_TABLE)
+        cursor = connection.connection.driver_connection.cursor()
+        cursor.copy_expert(
+            f"COPY employee_import ({', '.join(STAGING_COLUMNS)}) FROM STDIN",
+            buffer,
+        )
+        connection.execute(FLAG_REJECTED_ROWS)
+        for line, error in connection.execute(SELECT_REJECTED_ROWS):
+            rejected += 1
+            on_error(line, error)
+        inserted = connection.execute(INSERT_ACCEPTED_ROWS).rowcount
+        for (line,) in connection.execute(SELECT_CONFLICTING_ROWS):
+            rejected += 1
+            on_error(line, "Username or email is already in use.")
+    return inserted, rejected
+
+
+def import_employees(
+    file: BinaryIO,
+    file_format: str,
+    on_error: Callable[[int, str], None],
+    on_batch: Callable[[ImportSummary], None] | None = None,
+    batch_size: int = 5000,
+) -> ImportSummary:
+    """Import employees from ``file``, committing one batch at a time.
+
+    ``on_error`` is called with the line number and reason of every rejected
+    row, and ``on_batch`` with the running totals after each batch.
+    """
+    summary = ImportSummary()
+    rows = read_rows(file, file_format)
+
+    with (
+        ThreadPoolExecutor(settings.PASSWORD_HASH_WORKERS) as hasher,
+        engine.connect() as connection,
+    ):
+        for batch in _batches(rows, batch_size):
+            valid = []
+            for line, row in batch:
+                summary.total += 1
+                employee, error = _validate(row)
+                if error is not None:
+                    summary.rejected += 1
+                    on_error(line, error)
+                else:
+                    valid.append((line, employee))
+
+            hashed_passwords = hasher.map(
+                lambda employee: (
+                    hash_password(employee.password)
+                    if employee.password
+                    else None
+                ),
+                [employee for _, employee in valid],
+            )
+            staged = [
+                (line, employee, hashed_password)
+                for (line, employee), hashed_password in zip(
+                    valid, hashed_passwords
+                )
+            ]
+            if staged:
+                inserted, rejected = _load_batch(connection, staged, on_error)
+                summary.inserted += inserted
+                summary.rejected += rejected
+            if on_batch is not None:
+                on_batch(summary)
+
+    return summary
@@ -0,0 +1,378 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from contextlib import suppress
+import json
+import logging
+import time
+from typing import Any, Hashable
+from uuid import UUID
+
+from fastapi import Request, Response
+from jinja2 import MemcachedBytecodeCache
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.emgmt.change_feed import ChangeFeedLagged, Subscription
+from src.emgmt.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = settings.REDIS_URL or settings.CELERY_BROKER_URL
+
+redis_client = Redis.from_url(
+    REDIS_URL, decode_responses=True, socket_connect_timeout=1
+)
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class PrincipalCache:
+    """Two-tier cache of authenticated principals keyed by employee id.
+
+    Lookups go to the in-process LRU first and then to Redis, which is shared
+    by every replica. Invalidations are published over Redis pub/sub so each
+    replica drops its local copy. The local tier is only trusted while this
+    replica is subscribed, since invalidations cannot reach it otherwise.
+
+    Invalidating also bumps the employee's generation in Redis. A principal
+    read from the database is stored with the generation taken before that
+    read, so one that was already stale when it was stored is never served.
+    """
+
+    channel = "emgmt:principal:invalidate"
+
+    def __init__(self, redis: Redis, maxsize: int, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+        self.local = TTLCache(maxsize, ttl)
+        self.subscribed = False
+        self._listener: asyncio.Task | None = None
+        # Bumped on every local eviction, so a lookup that raced one does
+        # not put back what was just evicted.
+        self._evictions = 0
+
+    @staticmethod
+    def _key(employee_id: UUID) -> str:
+        return f"emgmt:principal:{employee_id}"
+
+    @staticmethod
+    def _generation_key(employee_id: UUID) -> str:
+        return f"emgmt:principal:{employee_id}:generation"
+
+    def _evict(self, employee_id: UUID | None = None) -> None:
+        self._evictions += 1
+        if employee_id is None:
+            self.local.clear()
+        else:
+            self.local.pop(employee_id)
+
+    async def generation(self, employee_id: UUID) -> str | None:
+        """Take before reading the principal that is passed to ``set``."""
+        try:
+            return (
+                await self.redis.get(self._generation_key(employee_id)) or "0"
+            )
+        except RedisError:
+            return None
+
+    async def get(self, employee_id: UUID) -> dict | None:
+        if self.subscribed:
+            principal = self.local.get(employee_id)
+            if principal is not None:
+                return principal
+
+        evictions = self._evictions
+        try:
+            cached, generation = await self.redis.mget(
+                self._key(employee_id), self._generation_key(employee_id)
+            )
+        except RedisError:
+            return None
+        if cached is None:
+            return None
+
+        data = json.loads(cached)
+        if data.get("generation") != (generation or "0"):
+            return None
+        principal = {
+            "id": UUID(data["id"]),
+            "role": data["role"],
+            "username": data["username"],
+        }
+        if self.subscribed and evictions == self._evictions:
+            self.local.set(employee_id, principal)
+        return principal
+
+    async def set(self, principal: dict, generation: str | None) -> None:
+        # The local tier is filled by the next get, once the entry is known
+        # to be current.
+        if generation is None:
+            return
+        data = {
+            "id": str(principal["id"]),
+            "role": principal["role"],
+            "username": principal["username"],
+            "generation": generation,
+        }
+        try:
+            await self.redis.set(
+                self._key(principal["id"]), json.dumps(data), ex=self.ttl
+            )
+        except RedisError:
+            logger.warning("Could not cache principal %s", principal["id"])
+
+    async def _drop(self, employee_id: UUID) -> None:
+        self._evict(employee_id)
+        async with self.redis.pipeline() as pipe:
+            pipe.incr(self._generation_key(employee_id))
+            pipe.delete(self._key(employee_id))
+            await pipe.execute()
+
+    async def invalidate(self, employee_id: UUID) -> None:
+        try:
+            await self._drop(employee_id)
+            await self.redis.publish(self.channel, str(employee_id))
+        except RedisError:
+            logger.warning("Could not invalidate principal %s", employee_id)
+
+    async def follow(self, subscription: Subscription) -> None:
+        """Drops employees changed outside the API, e.g. from the CLI."""
+        while True:
+            try:
+                async for change in subscription:
+                    if (
+                        change.entity == "employee"
+                        and change.action != "insert"
+                    ):
+                        with suppress(RedisError):
+                            await self._drop(change.employee_id)
+            except ChangeFeedLagged:
+                self._evict()
+                subscription = subscription.feed.subscribe()
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Invalidations may have been missed while disconnected.
+                    self._evict()
+                    self.subscribed = True
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            employee_id = UUID(message["data"])
+                        except ValueError:
+                            logger.warning(
+                                "Ignoring malformed principal invalidation %r",
+                                message["data"],
+                            )
+                            continue
+                        self._evict(employee_id)
+            except RedisError:
+                logger.warning("Principal cache lost its Redis subscription")
+            finally:
+                self.subscribed = False
+            await asyncio.sleep(1)
+
+    def start(self) -> None:
+        self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+
+class VersionedCache:
+    """Redis cache shared by every replica, invalidated all at once.
+
+    Keys are stored under the namespace's current version number, so
+    ``invalidate`` only has to bump that number; entries written under older
+    versions are never read again and expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, redis: Redis, namespace: str, ttl: int):
+        self.redis = redis
+        self.namespace = namespace
+        self.ttl = ttl
+        # Lookups served by this process; Redis errors count as misses.
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    @property
+    def _version_key(self) -> str:
+        return f"emgmt:{self.namespace}:version"
+
+    async def _version(self) -> str:
+        return await self.redis.get(self._version_key) or "0"
+
+    async def get(self, key: str) -> tuple[str | None, str | None]:
+        """Returns the cached value and the version to pass to ``set``.
+
+        The version is read before the caller queries the database, so a
+        value computed from data that an invalidation has since replaced
+        is stored under a version nobody reads any more.
+        """
+        try:
+            version = await self._version()
+            value = await self.redis.get(
+                f"emgmt:{self.namespace}:{version}:{key}"
+            )
+        except RedisError:
+            version = value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value, version
+
+    async def set(self, key: str, value: str, version: str | None) -> None:
+        if version is None:
+            return
+        try:
+            await self.redis.set(
+                f"emgmt:{self.namespace}:{version}:{key}", value, ex=self.ttl
+            )
+        except RedisError:
+            logger.warning("Could not cache %s entry %s", self.namespace, key)
+
+    async def invalidate(self) -> None:
+        try:
+            await self.redis.incr(self._version_key)
+        except RedisError:
+            logger.warning("Could not invalidate the %s cache", self.namespace)
+
+
+class ResponseCache:
+    """Rendered JSON responses shared by every replica, with strong ETags.
+
+    Entries are keyed by path and query string. A request whose
+    ``If-None-Match`` holds the current ETag gets an empty 304 instead.
+    """
+
+    def __init__(self, cache: VersionedCache):
+        self.cache = cache
+
+    @staticmethod
+    def _key(request: Request) -> str:
+        query = sorted(request.query_params.multi_items())
+        return f"{request.url.path}?{query}"
+
+    @staticmethod
+    def _respond(request: Request, entry: dict) -> Response:
+        headers = {**entry["headers"], "ETag": entry["etag"]}
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        if entry["etag"] in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+        return Response(
+            entry["body"], media_type="application/json", headers=headers
+        )
+
+    async def get(
+        self, request: Request
+    ) -> tuple[Response | None, str | None]:
+        """Returns the cached response and the version to pass to ``set``."""
+        cached, version = await self.cache.get(self._key(request))
+        if cached is None:
+            return None, version
+        return self._respond(request, json.loads(cached)), version
+
+    async def set(
+        self,
+        request: Request,
+        body: bytes,
+        headers: dict[str, str],
+        version: str | None,
+    ) -> Response:
+        entry = {
+            "etag": f'"{hashlib.sha256(body).hexdigest()}"',
+            "body": body.decode(),
+            "headers": headers,
+        }
+        await self.cache.set(self._key(request), json.dumps(entry), version)
+        return self._respond(request, entry)
+
+    async def invalidate(self) -> None:
+        await self.cache.invalidate()
+
+
+def redis_bytecode_cache() -> MemcachedBytecodeCache:
+    """Jinja bytecode cache shared by every replica through Redis.
+
+    Templates are compiled once per process at most, so the blocking client
+    is only used on first load. Redis errors are ignored by Jinja.
+    """
+    client = SyncRedis.from_url(
+        REDIS_URL, socket_connect_timeout=1, socket_timeout=1
+    )
+    return MemcachedBytecodeCache(
+        client, prefix="emgmt:jinja2:", timeout=settings.JINJA_BYTECODE_TTL
+    )
+
+
+principal_cache = PrincipalCache(
+    redis_client,
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
+
+index_cache = VersionedCache(
+    redis_client, namespace="index", ttl=settings.INDEX_CACHE_TTL
+)
+
+employee_list_cache = ResponseCache(
+    VersionedCache(
+        redis_client, namespace="employees", ttl=settings.LISTING_CACHE_TTL
+    )
+)
+
+department_list_cache = ResponseCache(
+    VersionedCache(
+        redis_client, namespace="departments", ttl=settings.LISTING_CACHE_TTL
+    )
+)
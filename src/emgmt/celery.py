@@ -1,12 +1,70 @@
+import json
 import time
 
-from celery import Celery
+from celery import Celery, signals, states
+from redis import Redis
 
 from src.emgmt.config import settings
 
 celery = Celery(__name__)
 celery.conf.broker_url = settings.CELERY_BROKER_URL
 celery.conf.result_backend = settings.CELERY_RESULT_BACKEND
+celery.conf.result_expires = settings.JOB_RESULT_TTL
+# Report STARTED instead of PENDING while a job is running
+celery.conf.task_track_started = True
+# Run the worker with -B to drain the notification outbox and prune the
+# change log on this schedule.
+celery.conf.include = ["src.emgmt.notifications", "src.emgmt.change_feed"]
+celery.conf.beat_schedule = {
+    "deliver notifications": {
+        "task": "deliver notifications",
+        "schedule": settings.NOTIFICATION_POLL_INTERVAL,
+    },
+    "prune change log": {"task": "prune change log", "schedule": 3600},
+}
+
+# Job events are published here by the worker, for the websocket endpoint.
+events_redis = Redis.from_url(
+    settings.REDIS_URL or settings.CELERY_BROKER_URL, socket_connect_timeout=1
+)
+
+
+def job_channel(job_id: str) -> str:
+    return f"emgmt:job:{job_id}:events"
+
+
+def job_event(job_id: str, status: str, result=None, error=None) -> dict:
+    event = {"job_id": job_id, "status": status}
+    if status == states.SUCCESS:
+        event["result"] = result
+    elif error is not None:
+        event["error"] = error
+    return event
+
+
+def publish_job_event(job_id: str, status: str, result=None, error=None):
+    event = job_event(job_id, status, result, error)
+    events_redis.publish(job_channel(job_id), json.dumps(event, default=str))
+
+
+@signals.task_prerun.connect
+def on_job_started(task_id, **kwargs):
+    publish_job_event(task_id, states.STARTED)
+
+
+@signals.task_success.connect
+def on_job_succeeded(sender, result, **kwargs):
+    publish_job_event(sender.request.id, states.SUCCESS, result=result)
+
+
+@signals.task_failure.connect
+def on_job_failed(task_id, exception, **kwargs):
+    publish_job_event(task_id, states.FAILURE, error=repr(exception))
+
+
+@signals.task_revoked.connect
+def on_job_revoked(request, **kwargs):
+    publish_job_event(request.id, states.REVOKED)
 
 
 @celery.task(name="create task")
@@ -0,0 +1,288 @@
+"""In-process stream of the changes logged by the ``change_log`` triggers.
+
+Each replica keeps one ``LISTEN emgmt_changes`` connection and hands every
+change to its subscribers in order of arrival. Changes carry the ``seq`` of
+their ``change_log`` row: after a reconnect the feed reads back what it
+missed, and a subscriber that fell behind can do the same with ``since``.
+Notifications are only sent on commit, so ``seq`` values may arrive out of
+order and rolled back transactions leave gaps; neither means a change was
+lost.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass
+import json
+import logging
+from uuid import UUID
+
+import asyncpg
+from sqlalchemy import delete, func, select
+
+from src.emgmt.celery import celery
+from src.emgmt.config import settings
+from src.emgmt.database import async_engine, engine
+from src.emgmt.models import ChangeLog
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "emgmt_changes"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    seq: int
+    entity: str
+    action: str
+    id: str
+    employee_id: UUID | None
+    department_ids: tuple[int, ...]
+
+    @classmethod
+    def from_payload(cls, item: list) -> "ChangeEvent":
+        seq, entity, action, entity_id, employee_id, department_ids = item
+        return cls(
+            seq,
+            entity,
+            action,
+            entity_id,
+            None if employee_id is None else UUID(employee_id),
+            tuple(department_ids),
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "entity": self.entity,
+            "action": self.action,
+            "id": self.id,
+            "employee_id": (
+                None if self.employee_id is None else str(self.employee_id)
+            ),
+            "department_ids": list(self.department_ids),
+        }
+
+
+class ChangeFeedLagged(Exception):
+    """Raised to a subscriber whose queue overflowed."""
+
+    def __init__(self, last_seq: int | None):
+        super().__init__(f"Change feed subscriber fell behind at {last_seq}")
+        self.last_seq = last_seq
+
+
+class Subscription:
+    def __init__(self, feed: "ChangeFeed", maxsize: int):
+        self.feed = feed
+        # None is queued last for a subscriber that overflowed
+        self.queue: asyncio.Queue[ChangeEvent | None] = asyncio.Queue(maxsize)
+        self.last_seq: int | None = None
+
+    def offer(self, event: ChangeEvent) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        event = await self.queue.get()
+        if event is None:
+            raise ChangeFeedLagged(self.last_seq)
+        self.last_seq = event.seq
+        return event
+
+    def close(self) -> None:
+        self.feed.subscriptions.discard(self)
+
+
+def _event(row) -> ChangeEvent:
+    return ChangeEvent(
+        row.seq,
+        row.entity,
+        row.action,
+        row.entity_id,
+        row.employee_id,
+        tuple(row.department_ids),
+    )
+
+
+class ChangeFeed:
+    # Recently published seqs, so replays after a reconnect are skipped
+    seen_size = 10_000
+
+    def __init__(self, dsn: str, batch_size: int = 1000):
+        self.dsn = dsn
+        self.batch_size = batch_size
+        self.subscriptions: set[Subscription] = set()
+        self.last_seq: int | None = None
+        self.connected = False
+        self.received = 0
+        self.caught_up = 0
+        self._seen: deque[int] = deque(maxlen=self.seen_size)
+        self._seen_set: set[int] = set()
+        self._listener: asyncio.Task | None = None
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "subscribers": len(self.subscriptions),
+            "last_seq": self.last_seq,
+            "received": self.received,
+            "caught_up": self.caught_up,
+        }
+
+    def subscribe(self, maxsize: int = 1000) -> Subscription:
+        subscription = Subscription(self, maxsize)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    async def since(
+        self, seq: int, limit: int | None = None
+    ) -> list[ChangeEvent]:
+        """Changes after ``seq`` in seq order, from the change log."""
+        statement = (
+            select(ChangeLog)
+            .where(ChangeLog.seq > seq)
+            .order_by(ChangeLog.seq)
+            .limit(limit or self.batch_size)
+        )
+        async with async_engine.connect() as connection:
+            rows = (await connection.execute(statement)).all()
+        return [_event(row) for row in rows]
+
+    def publish(self, event: ChangeEvent) -> None:
+        if event.seq in self._seen_set:
+            return
+        if len(self._seen) == self._seen.maxlen:
+            self._seen_set.discard(self._seen[0])
+        self._seen.append(event.seq)
+        self._seen_set.add(event.seq)
+        self.last_seq = max(self.last_seq or 0, event.seq)
+        for subscription in list(self.subscriptions):
+            if not subscription.offer(event):
+                self.subscriptions.discard(subscription)
+
+    async def _read_log(
+        self, connection: asyncpg.Connection, after: int, until: int | None
+    ) -> int:
+        """Publishes logged changes after ``after``; returns how many."""
+        count = 0
+        while True:
+            rows = await connection.fetch(
+                "SELECT seq, entity, action, entity_id, employee_id,"
+                " department_ids FROM change_log"
+                " WHERE seq > $1 AND ($2::bigint IS NULL OR seq <= $2)"
+                " ORDER BY seq LIMIT $3",
+                after,
+                until,
+                self.batch_size,
+            )
+            for row in rows:
+                self.publish(
+                    ChangeEvent(
+                        row["seq"],
+                        row["entity"],
+                        row["action"],
+                        row["entity_id"],
+                        row["employee_id"],
+                        tuple(row["department_ids"]),
+                    )
+                )
+            count += len(rows)
+            if len(rows) < self.batch_size:
+                return count
+            after = rows[-1]["seq"]
+
+    async def _handle(self, connection: asyncpg.Connection, payload: str):
+        message = json.loads(payload)
+        if "events" in message:
+            for item in message["events"]:
+                self.received += 1
+                self.publish(ChangeEvent.from_payload(item))
+        else:
+            self.received += await self._read_log(
+                connection, message["first"] - 1, message["last"]
+            )
+
+    async def listen(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                payloads: asyncio.Queue[str | None] = asyncio.Queue()
+                connection.add_termination_listener(
+                    lambda conn: payloads.put_nowait(None)
+                )
+                await connection.add_listener(
+                    CHANNEL,
+                    lambda conn, pid, channel, payload: payloads.put_nowait(
+                        payload
+                    ),
+                )
+                # Listening first, so nothing committed from here on is
+                # missed by the catch-up.
+                if self.last_seq is None:
+                    self.last_seq = await connection.fetchval(
+                        "SELECT coalesce(max(seq), 0) FROM change_log"
+                    )
+                else:
+                    self.caught_up += await self._read_log(
+                        connection, self.last_seq, None
+                    )
+                self.connected = True
+                while (payload := await payloads.get()) is not None:
+                    await self._handle(connection, payload)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                logger.warning("Change feed lost its connection")
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+            await asyncio.sleep(1)
+
+    def start(self) -> None:
+        self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+
+@celery.task(name="prune change log")
+def prune_change_log() -> int:
+    """Deletes the changes before the first one of the retention window."""
+    # Walks the primary key up to the first change still kept.
+    oldest_kept = (
+        select(ChangeLog.seq)
+        .where(
+            ChangeLog.changed_at
+            > func.now()
+            - func.make_interval(0, 0, 0, 0, settings.CHANGE_LOG_RETENTION)
+        )
+        .order_by(ChangeLog.seq)
+        .limit(1)
+        .scalar_subquery()
+    )
+    with engine.begin() as connection:
+        return connection.execute(
+            delete(ChangeLog).where(ChangeLog.seq < oldest_kept)
+        ).rowcount
+
+
+change_feed = ChangeFeed(
+    settings.CHANGE_FEED_DSN
+    or f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
+    f"@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}"
+    f"/{settings.POSTGRES_DB}"
+)
@@ -0,0 +1,26 @@
+from sqlalchemy import func, select, text
+import typer
+
+from src.emgmt.database import engine
+from src.emgmt.models import DepartmentSummary
+
+app = typer.Typer()
+
+
+@app.command()
+def rebuild_summary() -> None:
+    """Recounts every department summary from the employee and task tables.
+
+    The summaries are normally kept current by triggers; this is for repair,
+    e.g. after the triggers were disabled for a manual data fix.
+    """
+    with engine.begin() as connection:
+        connection.execute(text("SELECT refresh_department_summary(NULL)"))
+        count = connection.execute(
+            select(func.count()).select_from(DepartmentSummary)
+        ).scalar_one()
+    typer.echo(f"Rebuilt the summaries of {count} departments.")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+from typing_extensions import Annotated
+
+import typer
+
+from src.emgmt.bulk_import import (
+    ImportSummary,
+    detect_format,
+    import_employees,
+)
+
+app = typer.Typer()
+
+
+@app.command()
+def import_file(
+    path: Annotated[
+        Path,
+        typer.Argument(
+            exists=True,
+            dir_okay=False,
+            help="CSV or JSONL file with one employee per row.",
+        ),
+    ],
+    file_format: Annotated[
+        str | None,
+        typer.Option(
+            "--format",
+            help="csv or jsonl; guessed from the file extension by default.",
+        ),
+    ] = None,
+    batch_size: Annotated[
+        int, typer.Option(help="Rows validated and loaded per transaction.")
+    ] = 5000,
+    report: Annotated[
+        Path | None,
+        typer.Option(
+            help="Write rejected rows here as JSONL instead of to stdout."
+        ),
+    ] = None,
+) -> None:
+    """Bulk import employees. Rows without a password cannot log in."""
+    if file_format is None:
+        try:
+            file_format = detect_format(path.name)
+        except ValueError as e:
+            typer.echo(str(e))
+            raise typer.Exit(code=1)
+    if file_format not in ("csv", "jsonl"):
+        typer.echo("Format must be csv or jsonl. Exiting...")
+        raise typer.Exit(code=1)
+
+    report_file = report.open("w") if report else None
+
+    def write_error(line: int, error: str) -> None:
+        entry = json.dumps({"line": line, "error": error})
+        if report_file:
+            report_file.write(entry + "\n")
+        else:
+            typer.echo(entry)
+
+    def show_progress(summary: ImportSummary) -> None:
+        typer.echo(
+            f"{summary.total} rows read, {summary.inserted} inserted, "
+            f"{summary.rejected} rejected",
+            err=True,
+        )
+
+    try:
+        with path.open("rb") as file:
+            summary = import_employees(
+                file,
+                file_format,
+                write_error,
+                on_batch=show_progress,
+                batch_size=batch_size,
+            )
+    finally:
+        if report_file:
+            report_file.close()
+
+    typer.echo(
+        f"Done: {summary.inserted} of {summary.total} rows imported, "
+        f"{summary.rejected} rejected."
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,30 @@
+import os
+from pathlib import Path
+
+import typer
+
+app = typer.Typer()
+
+
+@app.command()
+def clear() -> None:
+    """Empties PROMETHEUS_MULTIPROC_DIR before the app workers start.
+
+    Samples left by an earlier run, including the live gauges of workers that
+    crashed, would otherwise be merged into every scrape.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        typer.echo("PROMETHEUS_MULTIPROC_DIR is not set, nothing to clear.")
+        return
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    removed = 0
+    for samples in directory.glob("*.db"):
+        samples.unlink(missing_ok=True)
+        removed += 1
+    typer.echo(f"Removed {removed} sample files from {directory}.")
+
+
+if __name__ == "__main__":
+    app()
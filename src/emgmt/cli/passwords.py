@@ -0,0 +1,54 @@
+from statistics import median
+import time
+from typing_extensions import Annotated
+
+from passlib.hash import pbkdf2_sha256
+import typer
+
+from src.emgmt.config import settings
+
+app = typer.Typer()
+
+PROBE_ROUNDS = 10000
+
+
+def time_hash(rounds: int, samples: int) -> float:
+    hasher = pbkdf2_sha256.using(
+        rounds=rounds, salt_size=settings.PASSWORD_HASH_SALT_SIZE
+    )
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append(time.perf_counter() - start)
+    return median(timings)
+
+
+@app.command()
+def calibrate(
+    target_ms: Annotated[
+        float,
+        typer.Option(help="Target time for a single hash, in milliseconds."),
+    ] = 250.0,
+    samples: Annotated[
+        int,
+        typer.Option(help="Number of hashes timed per measurement."),
+    ] = 5,
+) -> None:
+    """Pick PASSWORD_HASH_ROUNDS so one hash takes about TARGET_MS here."""
+    probe = time_hash(PROBE_ROUNDS, samples)
+    # PBKDF2 cost is linear in the number of rounds.
+    rounds = PROBE_ROUNDS * (target_ms / 1000) / probe
+    rounds = max(1000, round(rounds / 1000) * 1000)
+    actual = time_hash(rounds, samples) * 1000
+
+    typer.echo(
+        f"Current: {settings.PASSWORD_HASH_ROUNDS} rounds "
+        f"({time_hash(settings.PASSWORD_HASH_ROUNDS, samples) * 1000:.1f} ms)"
+    )
+    typer.echo(f"Suggested: {rounds} rounds ({actual:.1f} ms)")
+    typer.echo(f"PASSWORD_HASH_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    app()
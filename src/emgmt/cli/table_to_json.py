@@ -1,40 +1,116 @@
-# from typing_extensions import Annotated
-# from uuid import UUID
+from contextlib import contextmanager
+import gzip
+from pathlib import Path
+import sys
+import time
+from typing_extensions import Annotated
 
-# from sqlalchemy import select
-# from sqlalchemy.orm import Session
-# import typer
+import typer
 
-# from src.emgmt.database import engine
-# from src.emgmt.models import Department, Employee, Task
-# from src.emgmt.utils import save_result_to_json
+from src.emgmt.database import engine
+from src.emgmt.export import FORMATS, RowWriter, build_export_query
 
-# app = typer.Typer()
+app = typer.Typer()
 
-# MODEL_MAP = {"department": Department, "employee": Employee, "task": Task}
 
+@contextmanager
+def open_output(output: Path | None, compress: bool):
+    if output is None:
+        if compress:
+            with gzip.open(sys.stdout.buffer, "wt", encoding="utf-8") as f:
+                yield f
+        else:
+            yield sys.stdout
+    elif compress:
+        with gzip.open(output, "wt", encoding="utf-8", newline="") as f:
+            yield f
+    else:
+        with output.open("w", encoding="utf-8", newline="") as f:
+            yield f
 
-# @app.command
-# def convert_to_json(
-#     tablename: Annotated[
-#         str,
-#         typer.Argument(help="Name of the table which must be ported to JSON."),
-#     ],
-#     # entity: Annotated[
-#     #     UUID | int,
-#     #     typer.Option(help="ID of the entity that must be ported to JSON."),
-#     # ],
-# ) -> None:
-#     model = MODEL_MAP.get(tablename.lower())
 
-#     if not model:
-#         typer.echo(f"Table: {tablename}")
-#         raise typer.Exit(code=1)
+@app.command()
+def export_table(
+    tablename: Annotated[
+        str,
+        typer.Argument(help="Table to export: department, employee or task."),
+    ],
+    output: Annotated[
+        Path | None,
+        typer.Option(
+            "--output",
+            "-o",
+            help="File to write to; stdout by default. A .gz suffix "
+            "compresses the output.",
+        ),
+    ] = None,
+    file_format: Annotated[
+        str, typer.Option("--format", help="jsonl or csv.")
+    ] = "jsonl",
+    columns: Annotated[
+        str | None,
+        typer.Option(help="Comma separated columns to export, e.g. id,name."),
+    ] = None,
+    filters: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--filter",
+            help="Filter such as department_id=3, age>=30 or salary!=null. "
+            "May be repeated.",
+        ),
+    ] = None,
+    compress: Annotated[
+        bool, typer.Option("--gzip", help="Gzip the output.")
+    ] = False,
+    batch_size: Annotated[
+        int, typer.Option(help="Rows fetched per server-side cursor batch.")
+    ] = 5000,
+    progress_every: Annotated[
+        int, typer.Option(help="Report progress every N rows; 0 disables.")
+    ] = 100000,
+) -> None:
+    """Stream a table to JSONL or CSV in constant memory."""
+    if file_format not in FORMATS:
+        typer.echo("Format must be jsonl or csv. Exiting...")
+        raise typer.Exit(code=1)
+    try:
+        statement = build_export_query(
+            tablename, columns.split(",") if columns else None, filters
+        )
+    except ValueError as e:
+        typer.echo(f"{e}. Exiting...")
+        raise typer.Exit(code=1)
 
-#     with Session(engine) as session:
-#         result = session.execute(select(tablename))
-#         save_result_to_json(result, tablename)
+    compress = compress or (output is not None and output.suffix == ".gz")
+    writer = RowWriter(list(statement.selected_columns.keys()), file_format)
+    start = time.perf_counter()
+    count = 0
 
+    with (
+        engine.connect() as connection,
+        open_output(output, compress) as out,
+    ):
+        # yield_per fetches through a server-side cursor, batch by batch.
+        result = connection.execution_options(yield_per=batch_size).execute(
+            statement
+        )
+        out.write(writer.header())
+        for row in result:
+            out.write(writer.format(row))
+            count += 1
+            if progress_every and count % progress_every == 0:
+                typer.echo(
+                    f"{count} rows exported "
+                    f"({time.perf_counter() - start:.1f}s)",
+                    err=True,
+                )
 
-# if __name__ == "__main__":
-#     app()
+    typer.echo(
+        f"Exported {count} rows from {tablename} "
+        f"in {time.perf_counter() - start:.1f}s.",
+        err=True,
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -1,15 +1,33 @@
+import json
+from pathlib import Path
+import sys
 from typing_extensions import Annotated
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 import typer
 
+from src.emgmt.broadcast import change_event, publish_sync
+from src.emgmt.bulk_import import detect_format
 from src.emgmt.database import engine
 from src.emgmt.models import Employee, Task
+from src.emgmt.task_batch import BatchSummary, apply_task_operations
 
 app = typer.Typer()
 
 
+def _publish_change(action: str, task_id: int, employee: Employee) -> None:
+    publish_sync(
+        change_event(
+            "task",
+            action,
+            task_id,
+            department_ids=[employee.department_id],
+            employee_ids=[employee.id],
+        )
+    )
+
+
 @app.command()
 def add_task(
     username: Annotated[
@@ -59,6 +77,7 @@ def add_task(
             session.add(task)
             session.commit()
             session.refresh(task)
+            _publish_change("created", task.id, employee)
             typer.echo("Task added.")
             return
         else:
@@ -113,6 +132,7 @@ def update_task(
                 task.completed = completed
                 session.add(task)
                 session.commit()
+                _publish_change("updated", task.id, employee)
                 typer.echo("Task updated.")
                 return
             else:
@@ -151,6 +171,7 @@ def delete_task(
             if task:
                 session.delete(task)
                 session.commit()
+                _publish_change("deleted", int(task_id), employee)
                 typer.echo("Task deleted.")
                 return
             else:
@@ -161,6 +182,11 @@ def delete_task(
             raise typer.Exit(code=1)
 
 
+def _shorten(value: str | None, width: int) -> str:
+    value = " ".join((value or "").split())
+    return value if len(value) <= width else value[: width - 1] + "…"
+
+
 @app.command()
 def view_tasks(
     username: Annotated[
@@ -169,32 +195,130 @@ def view_tasks(
             help="Username of the employee whose tasks you wanna view."
         ),
     ],
+    completed: Annotated[
+        bool | None,
+        typer.Option(
+            "--completed/--open",
+            help="Only show completed or only open tasks.",
+            show_default=False,
+        ),
+    ] = None,
+    after: Annotated[
+        int | None,
+        typer.Option(help="Start after this task id, to view the next page."),
+    ] = None,
+    limit: Annotated[int, typer.Option(min=1, help="Tasks per page.")] = 50,
 ) -> None:
+    # One query: the outer join returns the employee even without tasks, so
+    # an unknown username is told apart from an empty page.
+    task_filter = Task.employee_id == Employee.id
+    if completed is not None:
+        task_filter &= Task.completed if completed else ~Task.completed
+    if after is not None:
+        task_filter &= Task.id > after
     with Session(engine) as session:
-        employee = session.execute(
-            select(Employee).where(Employee.username == username)
-        ).scalar_one_or_none()
-        if employee:
-            tasks = (
-                session.execute(
-                    select(Task)
-                    .join(Employee)
-                    .where(Employee.username == username)
-                )
-                .scalars()
-                .all()
-            )
-            for task in tasks:
-                completed: str = "No"
-                if task.completed:
-                    completed = "Yes"
-                typer.echo(
-                    f"\nTask ID: {task.id}\nTitle: {task.title}\nDescription: {task.description}\nTask Completed: {completed}\n"
-                )
-            return
-        else:
-            typer.echo("Invalid username. Exiting...")
+        rows = session.execute(
+            select(Employee.id, Task)
+            .outerjoin(Task, task_filter)
+            .where(Employee.username == username)
+            .order_by(Task.id)
+            .limit(limit)
+        ).all()
+    if not rows:
+        typer.echo("Invalid username. Exiting...")
+        raise typer.Exit(code=1)
+
+    tasks = [task for _, task in rows if task is not None]
+    if not tasks:
+        typer.echo("No tasks.")
+        return
+    typer.echo(f"{'ID':>8}  {'Done':4}  {'Title':30}  Description")
+    for task in tasks:
+        typer.echo(
+            f"{task.id:>8}  {'yes' if task.completed else 'no':4}  "
+            f"{_shorten(task.title, 30):30}  {_shorten(task.description, 40)}"
+        )
+    if len(tasks) == limit:
+        typer.echo(f"More tasks: --after {tasks[-1].id}")
+
+
+@app.command()
+def batch(
+    path: Annotated[
+        Path,
+        typer.Argument(
+            allow_dash=True,
+            dir_okay=False,
+            help="CSV or JSONL file of operations, or - for stdin.",
+        ),
+    ],
+    file_format: Annotated[
+        str | None,
+        typer.Option(
+            "--format",
+            help="csv or jsonl; guessed from the file extension by default.",
+        ),
+    ] = None,
+    batch_size: Annotated[
+        int, typer.Option(help="Operations applied per transaction.")
+    ] = 1000,
+    report: Annotated[
+        Path | None,
+        typer.Option(
+            help="Write failed lines here as JSONL instead of to stdout."
+        ),
+    ] = None,
+) -> None:
+    """Apply add, update, delete and complete operations in bulk.
+
+    Each line has an op, a username and, except for add, a task_id, plus the
+    title, description and completed fields to set. Failed lines are
+    reported and skipped.
+    """
+    stdin = str(path) == "-"
+    if file_format is None:
+        try:
+            file_format = detect_format(None if stdin else path.name)
+        except ValueError as e:
+            typer.echo(str(e))
             raise typer.Exit(code=1)
+    if file_format not in ("csv", "jsonl"):
+        typer.echo("Format must be csv or jsonl. Exiting...")
+        raise typer.Exit(code=1)
+
+    report_file = report.open("w") if report else None
+
+    def write_error(line: int, error: str) -> None:
+        entry = json.dumps({"line": line, "error": error})
+        if report_file:
+            report_file.write(entry + "\n")
+        else:
+            typer.echo(entry)
+
+    def show_progress(summary: BatchSummary) -> None:
+        typer.echo(
+            f"{summary.total} operations read, {summary.applied} applied, "
+            f"{summary.failed} failed",
+            err=True,
+        )
+
+    try:
+        with sys.stdin.buffer if stdin else path.open("rb") as file:
+            summary = apply_task_operations(
+                file,
+                file_format,
+                write_error,
+                on_batch=show_progress,
+                batch_size=batch_size,
+            )
+    finally:
+        if report_file:
+            report_file.close()
+
+    typer.echo(
+        f"Done: {summary.applied} of {summary.total} operations applied, "
+        f"{summary.failed} failed."
+    )
 
 
 if __name__ == "__main__":
@@ -23,9 +23,105 @@ class Settings(BaseSettings):
 
     ADMIN_PASSWORD: str
 
+    # Password hashing (pbkdf2_sha256). Stored hashes made with other
+    # parameters are rehashed transparently on the next successful login.
+    PASSWORD_HASH_ROUNDS: int = 29000
+    PASSWORD_HASH_SALT_SIZE: int = 16
+    # Hashing runs on a dedicated thread pool; requests beyond the workers
+    # plus the queue limit are rejected with a 503.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
+
     # Celery and Redis related
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+    # Redis used for caching and pub/sub; defaults to the Celery broker.
+    REDIS_URL: str | None = None
+    # Seconds that job records and results are kept after submission
+    JOB_RESULT_TTL: int = 3600
+    # Change events queued per websocket client before they are coalesced
+    BROADCAST_QUEUE_SIZE: int = 100
+
+    # Notification outbox, drained by the Celery worker's beat schedule.
+    # Deliveries per recipient are limited to NOTIFICATION_RATE_LIMIT per
+    # window; failed ones are retried after NOTIFICATION_RETRY_DELAY seconds,
+    # doubled on each attempt.
+    NOTIFICATION_LOG: str = "log.txt"
+    NOTIFICATION_POLL_INTERVAL: float = 5
+    NOTIFICATION_BATCH_SIZE: int = 500
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETRY_DELAY: int = 30
+    NOTIFICATION_RATE_LIMIT: int = 10
+    NOTIFICATION_RATE_WINDOW: int = 60
+
+    # Change feed. The listener needs a direct connection, as LISTEN does
+    # not work through PgBouncer in transaction pooling mode; defaults to
+    # the POSTGRES_* settings. Logged changes are kept for this many hours.
+    CHANGE_FEED_DSN: str | None = None
+    CHANGE_LOG_RETENTION: int = 24
+
+    # SQL instrumentation: X-DB-* response headers with each request's query
+    # count, DB time and slowest statement; the slow query log threshold;
+    # and how many runs of one statement in a request are logged as N+1.
+    SQL_DEBUG_HEADERS: bool = False
+    SLOW_QUERY_MS: float = 200
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Seconds between updates of the pool, queue and connection gauges
+    METRICS_SAMPLE_INTERVAL: float = 5
+
+    # Outbound HTTP gateway used by /external. Pool limits and timeouts are
+    # per replica; responses are fresh for GATEWAY_CACHE_TTL seconds and
+    # served stale for GATEWAY_STALE_TTL more while being refreshed. The
+    # circuit opens after GATEWAY_FAILURE_THRESHOLD consecutive failures and
+    # tries again after GATEWAY_RESET_TIMEOUT seconds.
+    EXTERNAL_USERS_URL: str = "https://jsonplaceholder.typicode.com/users"
+    GATEWAY_MAX_CONNECTIONS: int = 20
+    GATEWAY_MAX_KEEPALIVE: int = 10
+    GATEWAY_TIMEOUT: float = 5
+    GATEWAY_CONNECT_TIMEOUT: float = 2
+    GATEWAY_CACHE_TTL: float = 60
+    GATEWAY_STALE_TTL: float = 300
+    GATEWAY_FAILURE_THRESHOLD: int = 5
+    GATEWAY_RESET_TIMEOUT: float = 30
+
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 60
+
+    # HTML index page
+    INDEX_PAGE_SIZE: int = 50
+    INDEX_CACHE_TTL: int = 300
+    JINJA_BYTECODE_CACHE: bool = True
+    JINJA_BYTECODE_TTL: int = 86400
+
+    # Public employee and department listings, cached in Redis
+    LISTING_CACHE_TTL: int = 300
+
+    # File uploads are stored content-addressed (by SHA-256) under this
+    # directory; the limits apply per request across all of its files.
+    UPLOAD_DIR: str = "uploads"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    UPLOAD_MAX_FILES: int = 10
+
+    # Routers run on the asyncpg engine by default; set to False to serve the
+    # same handlers from the psycopg2 engine in a threadpool instead, e.g. to
+    # compare throughput on the same box.
+    DB_ASYNC: bool = True
+
+    # Connection pool, applied per engine in every app replica
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Set when connecting through PgBouncer in transaction pooling mode, so
+    # no prepared statements are cached on server connections.
+    DB_PGBOUNCER: bool = False
+    # Make lazy loads of relationships raise instead of querying, to catch
+    # N+1 regressions in development and tests.
+    DB_RAISE_ON_LAZY_LOAD: bool = False
 
     @cached_property
     def DATABASE_URL(self):
@@ -36,6 +132,10 @@ class Settings(BaseSettings):
             f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @cached_property
+    def ASYNC_DATABASE_URL(self):
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
     # # class based config deprecated in Pydantic V2, will be removed in V3
     # class Config:
     #     env_file = ".env"
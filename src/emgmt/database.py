@@ -1,21 +1,219 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import ORMExecuteState, Session, raiseload, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from src.emgmt.config import settings
+from src.emgmt.query_stats import instrument
 # from src.emgmt.models import Base
 
-engine = create_engine(settings.DATABASE_URL, echo=False)
+
+class PoolWaitStats:
+    """Running totals of the time callers spent waiting for a connection."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.timeouts += int(timed_out)
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "total_seconds": self.total_wait,
+            "avg_seconds": (
+                self.total_wait / self.checkouts if self.checkouts else 0.0
+            ),
+            "max_seconds": self.max_wait,
+        }
+
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _async_connect_args() -> dict:
+    if not settings.DB_PGBOUNCER:
+        return {}
+    # PgBouncer may hand each transaction a different server connection, so
+    # neither asyncpg nor SQLAlchemy may rely on statements prepared earlier.
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    poolclass=TimedQueuePool,
+    **_pool_options(),
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    echo=False,
+    poolclass=TimedAsyncQueuePool,
+    connect_args=_async_connect_args(),
+    **_pool_options(),
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+instrument(engine)
+instrument(async_engine.sync_engine)
+
+
+if settings.DB_RAISE_ON_LAZY_LOAD:
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _raise_on_lazy_load(orm_execute_state: ORMExecuteState) -> None:
+        # Any relationship a query does not load explicitly raises on access
+        # instead of quietly issuing another query.
+        if (
+            orm_execute_state.is_select
+            and not orm_execute_state.is_column_load
+        ):
+            orm_execute_state.statement = orm_execute_state.statement.options(
+                raiseload("*")
+            )
+
 
 # def create_db_and_tables():
 #     Base.metadata.create_all(engine)
 
 
+def pool_status(db_engine: Engine | AsyncEngine) -> dict:
+    pool = getattr(db_engine, "sync_engine", db_engine).pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # QueuePool counts overflow from -pool_size upwards.
+        "overflow": max(pool.overflow(), 0),
+        "wait": pool.wait_stats.as_dict(),
+    }
+
+
+class ThreadedSession:
+    """Awaitable facade over a sync ``Session``.
+
+    Exposes the subset of the ``AsyncSession`` API used by the routers and
+    runs every blocking call in the threadpool, so the same handlers can be
+    served from the psycopg2 engine when ``settings.DB_ASYNC`` is off.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.execute, *args, **kwargs
+        )
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalar, *args, **kwargs
+        )
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalars, *args, **kwargs
+        )
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def refresh(self, *args, **kwargs) -> None:
+        await run_in_threadpool(self.sync_session.refresh, *args, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    if not settings.DB_ASYNC:
+        db = ThreadedSession(SessionLocal(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,189 @@
+"""Row-by-row table export shared by the CLI and the HTTP export endpoints.
+
+Queries are built from a table name, an optional column selection and simple
+``column<op>value`` filters, and every row is formatted on its own so that
+callers can stream results from a server-side cursor in constant memory.
+"""
+
+import csv
+from datetime import date
+import io
+import json
+import operator
+import re
+from typing import Any
+import zlib
+
+from sqlalchemy import Column, Select, select
+
+from src.emgmt.models import Base, Department, Employee, Task
+
+MODEL_MAP: dict[str, type[Base]] = {
+    "department": Department,
+    "employee": Employee,
+    "task": Task,
+}
+
+# Never exported, even when asked for explicitly.
+HIDDEN_COLUMNS = {"hashed_password"}
+
+FORMATS = ("jsonl", "csv")
+
+FILTER_PATTERN = re.compile(r"^(\w+)\s*(>=|<=|!=|=|>|<)\s*(.*)$")
+
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+TRUE_VALUES = {"true", "t", "yes", "y", "1"}
+FALSE_VALUES = {"false", "f", "no", "n", "0"}
+
+
+def resolve_columns(
+    model: type[Base], names: list[str] | None = None
+) -> list[Column]:
+    table_columns = {
+        column.name: column
+        for column in model.__table__.columns
+        if column.name not in HIDDEN_COLUMNS
+    }
+    if not names:
+        return list(table_columns.values())
+    unknown = [name for name in names if name not in table_columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return [table_columns[name] for name in names]
+
+
+def _coerce(column: Column, value: str) -> Any:
+    python_type = column.type.python_type
+    if python_type is bool:
+        if value.lower() in TRUE_VALUES:
+            return True
+        if value.lower() in FALSE_VALUES:
+            return False
+        raise ValueError(f"Invalid boolean for {column.name}: {value}")
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def parse_filters(model: type[Base], expressions: list[str] | None) -> list:
+    """Turn ``column<op>value`` strings into WHERE clauses for ``model``.
+
+    ``null`` compares against SQL NULL with ``=`` and ``!=``.
+    """
+    clauses = []
+    for expression in expressions or []:
+        match = FILTER_PATTERN.match(expression)
+        if not match:
+            raise ValueError(f"Invalid filter: {expression}")
+        name, op, value = match.groups()
+        column = model.__table__.columns.get(name)
+        if column is None or name in HIDDEN_COLUMNS:
+            raise ValueError(f"Unknown column in filter: {name}")
+        if value.lower() == "null" and op in ("=", "!="):
+            clauses.append(
+                column.is_(None) if op == "=" else column.is_not(None)
+            )
+            continue
+        try:
+            clauses.append(OPERATORS[op](column, _coerce(column, value)))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value in filter: {expression}")
+    return clauses
+
+
+def build_export_query(
+    tablename: str,
+    columns: list[str] | None = None,
+    filters: list[str] | None = None,
+) -> Select:
+    model = MODEL_MAP.get(tablename.lower())
+    if model is None:
+        raise ValueError(f"Unknown table: {tablename}")
+    return (
+        select(*resolve_columns(model, columns))
+        .where(*parse_filters(model, filters))
+        .order_by(*model.__table__.primary_key.columns)
+    )
+
+
+class RowWriter:
+    """Formats one row at a time as a JSON line or a CSV record."""
+
+    def __init__(self, keys: list[str], file_format: str):
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown format: {file_format}")
+        self.keys = keys
+        self.file_format = file_format
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, lineterminator="\n")
+
+    def _csv_line(self, values) -> str:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._csv.writerow(values)
+        return self._buffer.getvalue()
+
+    def header(self) -> str:
+        if self.file_format == "csv":
+            return self._csv_line(self.keys)
+        return ""
+
+    def format(self, row) -> str:
+        if self.file_format == "csv":
+            return self._csv_line(
+                "" if value is None else value for value in row
+            )
+        # default=str keeps Decimal precision and handles UUIDs and dates.
+        return json.dumps(dict(zip(self.keys, row)), default=str) + "\n"
+
+
+class ExportStream:
+    """Buffers formatted rows into byte chunks, optionally gzip-compressed.
+
+    ``feed`` returns a chunk whenever about ``chunk_size`` bytes of text are
+    buffered and None otherwise; ``finish`` returns whatever is left.
+    """
+
+    def __init__(
+        self, writer: RowWriter, compress: bool, chunk_size: int = 64 * 1024
+    ):
+        self.writer = writer
+        self.chunk_size = chunk_size
+        # wbits=31 makes zlib write a gzip header and trailer.
+        self._compressor = zlib.compressobj(wbits=31) if compress else None
+        self._lines = [writer.header()]
+        self._size = len(self._lines[0])
+
+    def _encode(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if self._compressor is not None:
+            return self._compressor.compress(data)
+        return data
+
+    def _flush(self) -> bytes:
+        chunk = self._encode("".join(self._lines))
+        self._lines = []
+        self._size = 0
+        return chunk
+
+    def feed(self, row) -> bytes | None:
+        line = self.writer.format(row)
+        self._lines.append(line)
+        self._size += len(line)
+        if self._size >= self.chunk_size:
+            return self._flush() or None
+        return None
+
+    def finish(self) -> bytes:
+        chunk = self._flush()
+        if self._compressor is not None:
+            chunk += self._compressor.flush()
+        return chunk
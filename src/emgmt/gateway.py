@@ -0,0 +1,150 @@
+"""Gateway for outbound HTTP calls to third-party APIs.
+
+Responses are cached in-process for ``ttl`` seconds and then served stale
+for up to ``stale_ttl`` more while one background request refreshes them.
+Identical requests in flight at the same time share one upstream call, and
+a circuit breaker stops calling an upstream that keeps failing, serving the
+last cached response instead when there is one.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from httpx import AsyncClient, HTTPError
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures.
+
+    Once ``reset_timeout`` seconds have passed, a single trial call is let
+    through: success closes the breaker and failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._trial:
+            return False
+        self._trial = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+
+class HTTPGateway:
+    def __init__(
+        self,
+        client: AsyncClient,
+        ttl: float,
+        stale_ttl: float,
+        breaker: CircuitBreaker,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.breaker = breaker
+        self._cache: dict[str, tuple[float, Any]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._inflight),
+            "circuit": self.breaker.state,
+        }
+
+    async def _load(self, url: str) -> Any:
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(f"Circuit open for {url}")
+        try:
+            response = await self.client.get(url)
+            response.raise_for_status()
+            value = response.json()
+        except (HTTPError, ValueError) as e:
+            self.errors += 1
+            self.breaker.record_failure()
+            raise UpstreamUnavailable(f"{url}: {e!r}") from e
+        self.breaker.record_success()
+        self._cache[url] = (time.monotonic(), value)
+        return value
+
+    def _done(self, url: str, task: asyncio.Task) -> None:
+        self._inflight.pop(url, None)
+        # Background refreshes have nobody awaiting them.
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("%s", task.exception())
+
+    def _start(self, url: str) -> asyncio.Task:
+        task = self._inflight.get(url)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.create_task(self._load(url))
+        self._inflight[url] = task
+        task.add_done_callback(lambda task: self._done(url, task))
+        return task
+
+    async def get_json(self, url: str) -> Any:
+        entry = self._cache.get(url)
+        if entry is not None:
+            fetched_at, value = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale += 1
+                self._start(url)
+                return value
+        self.misses += 1
+        try:
+            # Shielded, so a caller that goes away does not cancel the
+            # request for the others waiting on it.
+            return await asyncio.shield(self._start(url))
+        except UpstreamUnavailable:
+            # An old response beats an error.
+            if entry is not None:
+                return entry[1]
+            raise
@@ -1,33 +1,104 @@
+import asyncio
 from contextlib import asynccontextmanager
 import socket
-import time
 
-from fastapi import FastAPI, Request, Depends, BackgroundTasks, WebSocket
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Request,
+    Depends,
+    Query,
+    WebSocket,
+)
+from fastapi.responses import HTMLResponse
 
 # from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from httpx import AsyncClient
+from httpx import AsyncClient, Limits, Timeout
+from markupsafe import Markup
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import uvicorn
 
-from src.emgmt.celery import create_task
-from src.emgmt.database import get_db
+from src.emgmt.broadcast import change_hub
+from src.emgmt.change_feed import change_feed
+from src.emgmt.cache import (
+    department_list_cache,
+    employee_list_cache,
+    index_cache,
+    principal_cache,
+    redis_bytecode_cache,
+    redis_client,
+)
+from src.emgmt.config import settings
+from src.emgmt.database import (
+    async_engine,
+    engine,
+    get_async_db,
+    pool_status,
+)
+from src.emgmt.gateway import CircuitBreaker, HTTPGateway, UpstreamUnavailable
 from src.emgmt.models import Employee
-from src.emgmt.routers import departments, employees, auth, upload_files
+from src.emgmt.query_stats import track_queries
+from src.emgmt.notifications import (
+    delivery_stats,
+    outbox_depth,
+    queue_notification,
+)
+from src.emgmt import metrics
+from src.emgmt.routers import (
+    changes,
+    departments,
+    employees,
+    auth,
+    exports,
+    jobs,
+    tasks,
+    upload_files,
+)
 from src.emgmt.utils import (
     create_admin_user,
+    encode_cursor,
     html,
-    write_notification,
+    keyset_after,
 )  # , get_client
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.client = AsyncClient()
+    app.client = AsyncClient(
+        limits=Limits(
+            max_connections=settings.GATEWAY_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GATEWAY_MAX_KEEPALIVE,
+        ),
+        timeout=Timeout(
+            settings.GATEWAY_TIMEOUT, connect=settings.GATEWAY_CONNECT_TIMEOUT
+        ),
+    )
+    app.gateway = HTTPGateway(
+        app.client,
+        ttl=settings.GATEWAY_CACHE_TTL,
+        stale_ttl=settings.GATEWAY_STALE_TTL,
+        breaker=CircuitBreaker(
+            settings.GATEWAY_FAILURE_THRESHOLD, settings.GATEWAY_RESET_TIMEOUT
+        ),
+    )
     await create_admin_user()
+    principal_cache.start()
+    change_hub.start()
+    change_feed.start()
+    follower = asyncio.create_task(
+        principal_cache.follow(change_feed.subscribe())
+    )
+    sampler = asyncio.create_task(metrics.sample_forever())
     yield
+    sampler.cancel()
+    metrics.shutdown()
+    follower.cancel()
+    await change_feed.stop()
+    await change_hub.stop()
+    await principal_cache.stop()
+    await redis_client.aclose()
     await app.client.aclose()
 
 
@@ -42,25 +113,88 @@ app = FastAPI(
 
 
 templates = Jinja2Templates(directory="src/emgmt/templates")
+if settings.JINJA_BYTECODE_CACHE:
+    templates.env.bytecode_cache = redis_bytecode_cache()
 
 
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.perf_counter()
-    response = await call_next(request)
-    process_time = time.perf_counter() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+# Also stamps X-Process-Time on each response
+app.middleware("http")(metrics.track_request)
+app.middleware("http")(track_queries)
 
 
 @app.get("/", response_class=HTMLResponse)
-async def index(request: Request, session: Session = Depends(get_db)):
+async def index(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(default=settings.INDEX_PAGE_SIZE, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_db),
+):
+    # The employee list is identical on every replica, so it is rendered
+    # once and shared through Redis until the next employee write.
+    cache_key = f"{limit}:{cursor or ''}"
+    employee_list, version = await index_cache.get(cache_key)
+    if employee_list is None:
+        sort_columns = [Employee.name, Employee.id]
+        statement = (
+            select(Employee.id, Employee.name, Employee.email)
+            .order_by(*sort_columns)
+            .limit(limit)
+        )
+        if cursor is not None:
+            statement = statement.where(keyset_after(cursor, sort_columns))
+        rows = (await session.execute(statement)).all()
+        employee_list = templates.get_template("employee_list.html").render(
+            employees=rows,
+            limit=limit,
+            next_cursor=(
+                encode_cursor(rows[-1], sort_columns)
+                if len(rows) == limit
+                else None
+            ),
+        )
+        await index_cache.set(cache_key, employee_list, version)
+
     context = {
-        "request": request,
-        "employees": session.execute(select(Employee)).scalars().all(),
+        "employee_list": Markup(employee_list),
         "hostname": socket.gethostname(),
     }
-    return templates.TemplateResponse("index.html", context)
+    return templates.TemplateResponse(request, "index.html", context)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    await metrics.sample()
+    return metrics.render()
+
+
+@app.get("/db-pool")
+async def db_pool_status():
+    return {
+        "hostname": socket.gethostname(),
+        "async": pool_status(async_engine),
+        "sync": pool_status(engine),
+    }
+
+
+@app.get("/cache-stats")
+async def cache_stats():
+    # Counters are per process, like the pool status above.
+    return {
+        "hostname": socket.gethostname(),
+        "index": index_cache.stats(),
+        "employees": employee_list_cache.cache.stats(),
+        "departments": department_list_cache.cache.stats(),
+    }
+
+
+@app.get("/broadcast-stats")
+async def broadcast_stats():
+    # Websocket clients connected to this replica
+    return {
+        "hostname": socket.gethostname(),
+        **change_hub.stats(),
+        "change_feed": change_feed.stats(),
+    }
 
 
 @app.get("/chat/")
@@ -76,10 +210,10 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.send_text(f"Message text was: {data}")
 
 
-@app.post("/celery-task")
-async def celery_task(delay: int, x: int, y: int):
-    task = create_task.delay(delay, x, y)
-    return JSONResponse({"Task:": task.get()})
+@app.post("/celery-task", status_code=202)
+async def celery_task(request: Request, delay: int, x: int, y: int):
+    # Kept for existing clients; poll the returned status_url for the result.
+    return await jobs.submit_job(request, delay, x, y)
 
 
 @app.get("/get_headers")
@@ -106,22 +240,44 @@ async def get_all_request_headers(request: Request):
 
 @app.get("/external")
 async def external(request: Request):
-    external_api_url = "https://jsonplaceholder.typicode.com/users"
-    client = request.app.client
-    response = await client.get(external_api_url)
-    users = response.json()
-    return users
+    try:
+        return await request.app.gateway.get_json(settings.EXTERNAL_USERS_URL)
+    except UpstreamUnavailable:
+        raise HTTPException(
+            status_code=503, detail="External service unavailable."
+        )
+
+
+@app.get("/external/stats")
+async def external_stats(request: Request):
+    return {"hostname": socket.gethostname(), **request.app.gateway.stats()}
 
 
 @app.post("/send-notification/{email}")
-async def send_notification(email: str, background_tasks: BackgroundTasks):
-    background_tasks.add_task(write_notification, email, message="some message")
+async def send_notification(
+    email: str, session: AsyncSession = Depends(get_async_db)
+):
+    # Delivered from the outbox by the Celery worker
+    queue_notification(session, email, "some message")
+    await session.commit()
     return {"message": "notification sent in background."}
 
 
+@app.get("/notification-stats")
+async def notification_stats(session: AsyncSession = Depends(get_async_db)):
+    return {
+        "outbox": await outbox_depth(session),
+        "delivery": await delivery_stats(),
+    }
+
+
 app.include_router(auth.router)
+app.include_router(changes.router)
 app.include_router(departments.router)
 app.include_router(employees.router)
+app.include_router(exports.router)
+app.include_router(jobs.router)
+app.include_router(tasks.router)
 app.include_router(upload_files.router)
 
 
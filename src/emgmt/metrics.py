@@ -0,0 +1,172 @@
+"""Prometheus metrics for the app, one scrape per replica.
+
+With several uvicorn workers, point ``PROMETHEUS_MULTIPROC_DIR`` at an empty
+directory before starting them: every worker then writes its samples there
+and ``/metrics`` merges them, whichever worker serves the scrape. Gauges say
+how their values combine across workers. Without the variable, the metrics
+are those of the current process only.
+
+Workers drop their live gauges when they shut down, but one that crashes
+cannot, so clear the directory with ``python -m src.emgmt.cli.metrics``
+before starting them.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from fastapi import Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import (
+    MultiProcessCollector,
+    mark_process_dead,
+)
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.emgmt.broadcast import change_hub
+from src.emgmt.celery import celery
+from src.emgmt.config import settings
+from src.emgmt.database import async_engine, engine, pool_status
+
+logger = logging.getLogger(__name__)
+
+# Finer than the default buckets below a second, where most routes' p99 is
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3]
+LATENCY_BUCKETS += [0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0]
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce the response headers, by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+# The route is only known once the request has been routed.
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections of each engine's pool, by state.",
+    ["engine", "state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total",
+    "Connection checkouts.",
+    ["engine"],
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that timed out.",
+    ["engine"],
+)
+DB_POOL_WAIT_SECONDS = Counter(
+    "db_pool_wait_seconds_total",
+    "Time spent waiting for a connection.",
+    ["engine"],
+)
+CELERY_QUEUE_LENGTH = Gauge(
+    "celery_queue_length",
+    "Messages waiting in the Celery broker queue.",
+    ["queue"],
+    multiprocess_mode="livemostrecent",
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "websocket_change_connections",
+    "Clients connected to the live changes websocket.",
+    multiprocess_mode="livesum",
+)
+
+broker = Redis.from_url(settings.CELERY_BROKER_URL, socket_connect_timeout=1)
+
+# The pools keep running totals; the counters are advanced by the difference
+# from the totals seen at the previous sample.
+pool_totals: dict[tuple[Counter, str], float] = {}
+
+
+def route_of(request: Request) -> str:
+    route = request.scope.get("route")
+    # Unmatched paths share one label to keep the series count bounded.
+    return getattr(route, "path", "unmatched")
+
+
+async def track_request(request: Request, call_next) -> Response:
+    method = request.method
+    in_progress = REQUESTS_IN_PROGRESS.labels(method)
+    in_progress.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        duration = time.perf_counter() - start
+        in_progress.dec()
+        REQUEST_DURATION.labels(method, route_of(request), status).observe(
+            duration
+        )
+    response.headers["X-Process-Time"] = str(duration)
+    return response
+
+
+def advance(counter: Counter, name: str, total: float) -> None:
+    previous = pool_totals.get((counter, name), 0)
+    # A disposed engine starts its totals again from zero.
+    counter.labels(name).inc(total - previous if total >= previous else total)
+    pool_totals[counter, name] = total
+
+
+async def sample() -> None:
+    """Updates the metrics that are read rather than counted."""
+    for name, db_engine in (("async", async_engine), ("sync", engine)):
+        status = pool_status(db_engine)
+        for state in ("checked_out", "idle", "overflow"):
+            DB_POOL_CONNECTIONS.labels(name, state).set(status[state])
+        wait = status["wait"]
+        advance(DB_POOL_CHECKOUTS, name, wait["checkouts"])
+        advance(DB_POOL_CHECKOUT_TIMEOUTS, name, wait["timeouts"])
+        advance(DB_POOL_WAIT_SECONDS, name, wait["total_seconds"])
+    WEBSOCKET_CONNECTIONS.set(change_hub.stats()["connections"])
+    queue = celery.conf.task_default_queue
+    try:
+        CELERY_QUEUE_LENGTH.labels(queue).set(await broker.llen(queue))
+    except RedisError:
+        logger.warning("Could not read the length of Celery queue %s", queue)
+
+
+async def sample_forever() -> None:
+    while True:
+        await sample()
+        await asyncio.sleep(settings.METRICS_SAMPLE_INTERVAL)
+
+
+def shutdown() -> None:
+    """Drops this worker's live gauges from the multiprocess directory.
+
+    Otherwise the connections and requests it had in flight when it stopped
+    would be added to the other workers' forever.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        mark_process_dead(os.getpid())
+
+
+def render() -> Response:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
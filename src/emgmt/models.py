@@ -1,18 +1,23 @@
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
 from uuid import uuid4
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Date,
+    DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Text,
+    func,
+    text,
     # UniqueConstraint,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -36,6 +41,9 @@ class Department(Base):
         # cascade="all, delete-orphan"
     )
 
+    # Keyset pagination over (name, id)
+    __table_args__ = (Index("ix_department_name_id", "name", "id"),)
+
 
 class Employee(Base):
     __tablename__ = "employee"
@@ -44,16 +52,16 @@ class Employee(Base):
         UUID(as_uuid=True), primary_key=True, default=uuid4
     )
     name: Mapped[str] = mapped_column(String, index=True, nullable=False)
-    age: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    age: Mapped[int | None] = mapped_column(Integer, index=True, nullable=True)
     username: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     email: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     hashed_password: Mapped[str | None] = mapped_column(String, nullable=True)
-    role: Mapped[str] = mapped_column(String, default="employee")
+    role: Mapped[str] = mapped_column(String, index=True, default="employee")
     salary: Mapped[Decimal | None] = mapped_column(
-        Numeric(10, 2), nullable=True
+        Numeric(10, 2), index=True, nullable=True
     )
     department_id: Mapped[int | None] = mapped_column(
-        Integer, ForeignKey("department.id"), nullable=True
+        Integer, ForeignKey("department.id"), index=True, nullable=True
     )
 
     department: Mapped[Department | None] = relationship(
@@ -68,6 +76,23 @@ class Employee(Base):
     #     UniqueConstraint("email", name="uq_employee_email"),
     # )
 
+    __table_args__ = (
+        # Keyset pagination over (name, id)
+        Index("ix_employee_name_id", "name", "id"),
+        # Minimum and maximum salary per department, for department_summary
+        Index("ix_employee_department_id_salary", "department_id", "salary"),
+        # Prefix/substring search (needs the pg_trgm extension)
+        *(
+            Index(
+                f"ix_employee_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+            for column in ("name", "username", "email")
+        ),
+    )
+
 
 class Task(Base):
     __tablename__ = "task"
@@ -85,3 +110,142 @@ class Task(Base):
     employee: Mapped[Employee] = relationship(
         "Employee", back_populates="tasks"
     )
+
+    __table_args__ = (
+        # Foreign key joins and per-employee keyset pagination over id
+        Index("ix_task_employee_id_id", "employee_id", "id"),
+        # The same for the open tasks only
+        Index(
+            "ix_task_open_employee_id_id",
+            "employee_id",
+            "id",
+            postgresql_where=text("NOT completed"),
+        ),
+    )
+
+
+class DepartmentSummary(Base):
+    """Per-department aggregates, kept current by database triggers.
+
+    The triggers on ``employee`` and ``task`` (see migration c6b508f9b133)
+    add each statement's changes to the rows of the departments it touched,
+    so the averages are kept as running totals and counts. Running
+    ``refresh_department_summary(NULL)`` recounts every row.
+    """
+
+    __tablename__ = "department_summary"
+
+    department_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("department.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    headcount: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    age_total: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0"
+    )
+    age_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    average_age: Mapped[Decimal | None] = mapped_column(
+        Numeric(5, 2), nullable=True
+    )
+    salary_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    salary_total: Mapped[Decimal | None] = mapped_column(
+        Numeric(14, 2), nullable=True
+    )
+    salary_average: Mapped[Decimal | None] = mapped_column(
+        Numeric(10, 2), nullable=True
+    )
+    salary_min: Mapped[Decimal | None] = mapped_column(
+        Numeric(10, 2), nullable=True
+    )
+    salary_max: Mapped[Decimal | None] = mapped_column(
+        Numeric(10, 2), nullable=True
+    )
+    open_tasks: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    completed_tasks: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class Notification(Base):
+    """Outbox of notifications, written in the transaction that causes them.
+
+    Pending rows are claimed in batches by the ``deliver notifications``
+    Celery task, which coalesces them per recipient and retries failures
+    with backoff until ``NOTIFICATION_MAX_ATTEMPTS``.
+    """
+
+    __tablename__ = "notification"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=True
+    )
+    recipient: Mapped[str] = mapped_column(String, nullable=False)
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+    # pending, delivered or failed
+    status: Mapped[str] = mapped_column(
+        String, nullable=False, server_default="pending"
+    )
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    # Not claimed before this time; pushed back by retries and rate limits
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    delivered_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    __table_args__ = (
+        # The delivery queue: only pending rows, in claim order
+        Index(
+            "ix_notification_pending_available_at_id",
+            "available_at",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+
+class ChangeLog(Base):
+    """Row changes to ``employee``, ``department`` and ``task``.
+
+    Written by statement level triggers (see migration 2b7e5c90d1f4), which
+    also NOTIFY the ``emgmt_changes`` channel. ``seq`` orders the changes
+    and is what listeners catch up from after a reconnect.
+    """
+
+    __tablename__ = "change_log"
+
+    seq: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=True
+    )
+    entity: Mapped[str] = mapped_column(String, nullable=False)
+    # insert, update or delete
+    action: Mapped[str] = mapped_column(String, nullable=False)
+    entity_id: Mapped[str] = mapped_column(String, nullable=False)
+    employee_id: Mapped[str | None] = mapped_column(
+        UUID(as_uuid=True), nullable=True
+    )
+    department_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer), nullable=False
+    )
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
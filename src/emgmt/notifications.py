@@ -0,0 +1,265 @@
+"""Notification outbox and its delivery worker.
+
+Requests add notifications to the ``notification`` table in their own
+transaction, so a notification exists exactly when the change that caused it
+was committed. The Celery beat schedule runs ``deliver notifications`` every
+``NOTIFICATION_POLL_INTERVAL`` seconds. It claims due rows in batches with
+``FOR UPDATE SKIP LOCKED``, so several workers can drain the outbox at once,
+and sends all of a recipient's claimed messages as one delivery. Delivery is
+at least once: a batch whose commit fails is sent again.
+"""
+
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+import logging
+import time
+from typing import Callable, Iterable
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.engine import Connection, Row
+
+from src.emgmt.cache import REDIS_URL, redis_client
+from src.emgmt.celery import celery
+from src.emgmt.config import settings
+from src.emgmt.database import engine
+from src.emgmt.models import Notification
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "emgmt:notify:stats"
+
+redis = Redis.from_url(
+    REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=1,
+    socket_timeout=1,
+)
+
+
+def queue_notification(session, recipient: str, message: str) -> None:
+    """Add a notification to the session's transaction."""
+    session.add(Notification(recipient=recipient, message=message))
+
+
+def write_notification(recipient: str, messages: list[str]) -> None:
+    with open(settings.NOTIFICATION_LOG, mode="a") as log:
+        log.write(f"notification for {recipient}: {' | '.join(messages)}\n")
+
+
+class RateLimiter:
+    """Fixed window limit on deliveries per recipient, shared via Redis."""
+
+    def __init__(self, redis: Redis, limit: int, window: int):
+        self.redis = redis
+        self.limit = limit
+        self.window = window
+
+    def acquire(self, recipient: str, now: float) -> float | None:
+        """Returns None if allowed, else seconds until the next window."""
+        window = int(now // self.window)
+        key = f"emgmt:notify:rate:{recipient}:{window}"
+        try:
+            pipeline = self.redis.pipeline()
+            pipeline.incr(key)
+            pipeline.expire(key, self.window)
+            count, _ = pipeline.execute()
+        except RedisError:
+            # Fail open: a Redis outage should not stop deliveries.
+            logger.warning("Rate limit unavailable for %s", recipient)
+            return None
+        if count <= self.limit:
+            return None
+        return (window + 1) * self.window - now
+
+
+@dataclass
+class DeliveryStats:
+    claimed: int = 0
+    # Rows delivered, and the coalesced deliveries they were sent in
+    delivered: int = 0
+    sent: int = 0
+    deferred: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.NOTIFICATION_RETRY_DELAY * 2**attempts)
+
+
+def deliver_claimed(
+    rows: Iterable[Row],
+    limiter: RateLimiter,
+    send: Callable[[str, list[str]], None],
+    now: datetime,
+) -> tuple[list[int], list[dict], DeliveryStats]:
+    """Sends the claimed rows, coalesced per recipient.
+
+    Returns the ids delivered, the new state of every other row, and the
+    counts.
+    """
+    stats = DeliveryStats()
+    by_recipient: dict[str, list[Row]] = {}
+    for row in rows:
+        stats.claimed += 1
+        by_recipient.setdefault(row.recipient, []).append(row)
+
+    delivered, changes = [], []
+    for recipient, recipient_rows in by_recipient.items():
+        wait = limiter.acquire(recipient, now.timestamp())
+        if wait is not None:
+            stats.deferred += len(recipient_rows)
+            changes.extend(
+                {
+                    "b_id": row.id,
+                    "b_status": "pending",
+                    "b_attempts": row.attempts,
+                    "b_available_at": now + timedelta(seconds=wait),
+                    "b_error": row.last_error,
+                }
+                for row in recipient_rows
+            )
+            continue
+        # Identical messages are sent once.
+        messages = list(dict.fromkeys(row.message for row in recipient_rows))
+        try:
+            send(recipient, messages)
+        except Exception as e:
+            for row in recipient_rows:
+                attempts = row.attempts + 1
+                if attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                    status = "failed"
+                    stats.failed += 1
+                else:
+                    status = "pending"
+                    stats.retried += 1
+                changes.append(
+                    {
+                        "b_id": row.id,
+                        "b_status": status,
+                        "b_attempts": attempts,
+                        "b_available_at": now + retry_delay(row.attempts),
+                        "b_error": repr(e),
+                    }
+                )
+            continue
+        stats.sent += 1
+        stats.delivered += len(recipient_rows)
+        delivered.extend(row.id for row in recipient_rows)
+    return delivered, changes, stats
+
+
+def deliver_batch(
+    connection: Connection,
+    limiter: RateLimiter,
+    batch_size: int,
+    send: Callable[[str, list[str]], None] = write_notification,
+) -> DeliveryStats:
+    """Claims, sends and records one batch in a single transaction."""
+    with connection.begin():
+        rows = connection.execute(
+            select(
+                Notification.id,
+                Notification.recipient,
+                Notification.message,
+                Notification.attempts,
+                Notification.last_error,
+            )
+            .where(
+                Notification.status == "pending",
+                Notification.available_at <= func.now(),
+            )
+            .order_by(Notification.available_at, Notification.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        delivered, changes, stats = deliver_claimed(
+            rows, limiter, send, datetime.now(timezone.utc)
+        )
+        if delivered:
+            connection.execute(
+                update(Notification)
+                .where(Notification.id.in_(delivered))
+                .values(
+                    status="delivered",
+                    attempts=Notification.attempts + 1,
+                    delivered_at=func.now(),
+                )
+            )
+        if changes:
+            connection.execute(
+                update(Notification)
+                .where(Notification.id == bindparam("b_id"))
+                .values(
+                    status=bindparam("b_status"),
+                    attempts=bindparam("b_attempts"),
+                    available_at=bindparam("b_available_at"),
+                    last_error=bindparam("b_error"),
+                ),
+                changes,
+            )
+    return stats
+
+
+def record_stats(stats: DeliveryStats) -> None:
+    try:
+        pipeline = redis.pipeline()
+        for field, value in asdict(stats).items():
+            if value:
+                pipeline.hincrby(STATS_KEY, field, value)
+        pipeline.hset(STATS_KEY, "last_run_at", time.time())
+        pipeline.execute()
+    except RedisError:
+        logger.warning("Could not record notification stats")
+
+
+async def outbox_depth(session) -> dict:
+    """Pending rows and how long the oldest due one has waited."""
+    pending, due, oldest_due = (
+        await session.execute(
+            select(
+                func.count(),
+                func.count().filter(Notification.available_at <= func.now()),
+                func.min(Notification.available_at).filter(
+                    Notification.available_at <= func.now()
+                ),
+            ).where(Notification.status == "pending")
+        )
+    ).one()
+    lag = 0.0
+    if oldest_due is not None:
+        lag = (datetime.now(timezone.utc) - oldest_due).total_seconds()
+    return {"pending": pending, "due": due, "lag_seconds": round(lag, 3)}
+
+
+async def delivery_stats() -> dict | None:
+    """Delivery counters summed over every worker."""
+    try:
+        stats = await redis_client.hgetall(STATS_KEY)
+    except RedisError:
+        return None
+    return {field: float(value) for field, value in stats.items()}
+
+
+@celery.task(name="deliver notifications")
+def deliver_notifications() -> dict:
+    """Drains the due notifications, one batch per transaction."""
+    limiter = RateLimiter(
+        redis,
+        settings.NOTIFICATION_RATE_LIMIT,
+        settings.NOTIFICATION_RATE_WINDOW,
+    )
+    total = DeliveryStats()
+    with engine.connect() as connection:
+        while True:
+            stats = deliver_batch(
+                connection, limiter, settings.NOTIFICATION_BATCH_SIZE
+            )
+            record_stats(stats)
+            for field, value in asdict(stats).items():
+                setattr(total, field, getattr(total, field) + value)
+            if stats.claimed < settings.NOTIFICATION_BATCH_SIZE:
+                break
+    return asdict(total)
@@ -0,0 +1,157 @@
+"""Per-request SQL statistics and the slow query log.
+
+Cursor events on both engines time every statement. Inside a request they
+are added up on the request's ``QueryStats``, which the middleware reports
+as ``X-DB-*`` headers when ``SQL_DEBUG_HEADERS`` is on. A statement that
+runs ``N_PLUS_ONE_THRESHOLD`` times or more in one request, whatever its
+parameters, is logged as a likely N+1 pattern. Statements slower than
+``SLOW_QUERY_MS`` are logged wherever they run, with literals and
+parameters normalised away so the log groups by statement.
+"""
+
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import json
+import logging
+import re
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.emgmt.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PARAMETERS = re.compile(r"%\(\w+\)s|%s|\$\d+|\?")
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+# Keeps the debug headers short and single line
+_HEADER_STATEMENT_LENGTH = 200
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement text with every literal and parameter replaced by ``?``."""
+    statement = _STRINGS.sub("?", statement)
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _NUMBERS.sub("?", statement)
+    statement = _LISTS.sub("(...)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest: str | None = None
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest = statement
+
+    def repeated(self) -> dict[str, int]:
+        return {
+            statement: count
+            for statement, count in self.statements.items()
+            if count >= settings.N_PLUS_ONE_THRESHOLD
+        }
+
+
+current_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_stats", default=None
+)
+# What the slow query log says a statement ran for
+current_route: ContextVar[str | None] = ContextVar(
+    "current_route", default=None
+)
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_stats.get()
+    if stats is None and duration * 1000 < settings.SLOW_QUERY_MS:
+        return
+    normalized = normalize_sql(statement)
+    if stats is not None:
+        stats.record(normalized, duration)
+    if duration * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "slow_query",
+                    "duration_ms": round(duration * 1000, 3),
+                    "statement": normalized,
+                    "executemany": executemany,
+                    "request": current_route.get(),
+                }
+            )
+        )
+
+
+def _handle_error(context) -> None:
+    # A failed statement never reaches after_cursor_execute.
+    if context.connection is not None and context.cursor is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def instrument(db_engine: Engine) -> None:
+    event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(db_engine, "handle_error", _handle_error)
+
+
+async def track_queries(request: Request, call_next) -> Response:
+    stats = QueryStats()
+    stats_token = current_stats.set(stats)
+    route_token = current_route.set(f"{request.method} {request.url.path}")
+    try:
+        response = await call_next(request)
+    finally:
+        current_stats.reset(stats_token)
+        current_route.reset(route_token)
+
+    for statement, count in stats.repeated().items():
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "repeated_query",
+                    "count": count,
+                    "statement": statement,
+                    "request": f"{request.method} {request.url.path}",
+                }
+            )
+        )
+    if settings.SQL_DEBUG_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time"] = f"{stats.total_time * 1000:.3f}ms"
+        if stats.slowest is not None:
+            response.headers["X-DB-Slowest"] = (
+                f"{stats.slowest_time * 1000:.3f}ms "
+                f"{stats.slowest[:_HEADER_STATEMENT_LENGTH]}"
+            )
+        repeated = stats.repeated()
+        if repeated:
+            response.headers["X-DB-Repeated-Queries"] = str(
+                sum(repeated.values())
+            )
+    return response
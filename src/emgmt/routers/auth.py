@@ -1,15 +1,27 @@
 from typing_extensions import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    WebSocket,
+    WebSocketException,
+    status,
+)
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.emgmt.database import get_db
+from src.emgmt.cache import principal_cache
+from src.emgmt.database import get_async_db
 from src.emgmt.models import Employee
-from src.emgmt.utils import verify_password, create_access_token, decode_token
+from src.emgmt.utils import (
+    create_access_token,
+    decode_token,
+    verify_and_update_password_async,
+)
 
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -19,7 +31,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/")
 
 async def get_authenticated_employee(
     token: Annotated[str, Depends(oauth2_scheme)],
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,16 +48,21 @@ async def get_authenticated_employee(
 
         employee_id = UUID(employee_data["id"])
 
-        result = session.execute(
-            select(Employee.id, Employee.role, Employee.username).where(
-                Employee.id == employee_id
-            )
-        ).first()
+        employee_info = await principal_cache.get(employee_id)
+
+        if employee_info is None:
+            generation = await principal_cache.generation(employee_id)
+            result = (
+                await session.execute(
+                    select(
+                        Employee.id, Employee.role, Employee.username
+                    ).where(Employee.id == employee_id)
+                )
+            ).first()
 
-        if result:
-            employee_info = result._asdict()
-        else:
-            employee_info = None
+            if result:
+                employee_info = result._asdict()
+                await principal_cache.set(employee_info, generation)
 
         if not employee_info:
             raise HTTPException(
@@ -83,17 +100,70 @@ class RoleChecker:
 require_admin = RoleChecker(["admin"])
 
 
+def websocket_token(websocket: WebSocket, token: str | None = None) -> str:
+    """The bearer token of a websocket handshake.
+
+    Browsers cannot set headers on websockets, so the ``token`` query
+    parameter is accepted as well as the ``Authorization`` header.
+    """
+    scheme, _, credentials = websocket.headers.get(
+        "authorization", ""
+    ).partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    if token:
+        return token
+    raise WebSocketException(
+        code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated"
+    )
+
+
+async def get_websocket_employee(
+    token: Annotated[str, Depends(websocket_token)],
+    session: AsyncSession = Depends(get_async_db),
+) -> dict:
+    """get_authenticated_employee for websockets, which are closed with
+    1008 before being accepted instead of answered with a 401."""
+    try:
+        return await get_authenticated_employee(token, session)
+    except HTTPException as e:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason=e.detail
+        )
+    finally:
+        # The session lives as long as the websocket, which may be hours;
+        # give its connection back to the pool now.
+        await session.close()
+
+
+def require_admin_websocket(
+    employee_info: dict = Depends(get_websocket_employee),
+) -> UUID:
+    """require_admin for websockets."""
+    try:
+        return require_admin(employee_info)
+    except HTTPException as e:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason=e.detail
+        )
+
+
 @router.post("/")
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    employee = session.execute(
-        select(Employee).where(Employee.username == form_data.username)
+    employee = (
+        await session.execute(
+            select(Employee).where(Employee.username == form_data.username)
+        )
     ).scalar_one_or_none()
     if not employee:
         raise HTTPException(status_code=400, detail="User does not exists.")
-    if not verify_password(form_data.password, employee.hashed_password):
+    valid, new_hash = await verify_and_update_password_async(
+        form_data.password, employee.hashed_password
+    )
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials.")
 
     token_data = {
@@ -102,6 +172,10 @@ async def login(
         "id": str(employee.id),
     }
 
+    if new_hash is not None:
+        employee.hashed_password = new_hash
+        await session.commit()
+
     return {
         "access_token": create_access_token(token_data),
         "token_type": "bearer",
@@ -0,0 +1,175 @@
+import asyncio
+from uuid import UUID
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.emgmt.broadcast import TOPIC, Subscriber, change_hub
+from src.emgmt.change_feed import ChangeFeedLagged, change_feed
+from src.emgmt.database import get_async_db
+from src.emgmt.models import Employee
+from src.emgmt.routers.auth import (
+    get_websocket_employee,
+    require_admin,
+    require_admin_websocket,
+)
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+def parse_topics(topics: object) -> set[str] | None:
+    """Returns None unless ``topics`` is a list of well-formed topics."""
+    if not isinstance(topics, list) or not all(
+        isinstance(topic, str) for topic in topics
+    ):
+        return None
+    topics = {topic.strip().lower() for topic in topics}
+    if not all(TOPIC.match(topic) for topic in topics):
+        return None
+    return topics
+
+
+async def get_allowed_topics(
+    employee_info: dict = Depends(get_websocket_employee),
+    session: AsyncSession = Depends(get_async_db),
+) -> set[str] | None:
+    """The topics the caller may follow, or None for all of them.
+
+    As on the REST routes, only the admin sees every department and
+    employee; everyone else only themselves and their own department.
+    """
+    if employee_info["username"] == "admin":
+        return None
+    try:
+        department_id = await session.scalar(
+            select(Employee.department_id).where(
+                Employee.id == employee_info["id"]
+            )
+        )
+    finally:
+        await session.close()
+    allowed = {f"employee:{employee_info['id']}"}
+    if department_id is not None:
+        allowed.add(f"department:{department_id}")
+    return allowed
+
+
+async def send_changes(websocket: WebSocket, subscriber: Subscriber) -> None:
+    while (message := await subscriber.next_message()) is not None:
+        await websocket.send_text(message)
+    await websocket.close(code=1013, reason="Client too slow")
+
+
+@router.websocket("/ws")
+async def change_events(
+    websocket: WebSocket,
+    topics: str = "",
+    allowed: set[str] | None = Depends(get_allowed_topics),
+):
+    """Streams change events for the subscribed topics.
+
+    Topics are ``department:<id>`` or ``employee:<uuid>``, given as a comma
+    separated ``topics`` query parameter. Send
+    ``{"subscribe": [...]}`` or ``{"unsubscribe": [...]}`` to change them.
+    Authenticate with a bearer token in the ``Authorization`` header or
+    the ``token`` query parameter.
+    """
+    await websocket.accept()
+    initial = parse_topics(topics.split(",") if topics else [])
+    if initial is None:
+        await websocket.close(code=1008, reason="Invalid topic")
+        return
+    if allowed is not None and not initial <= allowed:
+        await websocket.close(code=1008, reason="Insufficient permissions")
+        return
+    subscriber = change_hub.connect(initial)
+    sender = asyncio.create_task(send_changes(websocket, subscriber))
+    try:
+        while True:
+            try:
+                request = await websocket.receive_json()
+            except ValueError:
+                request = None
+            if not isinstance(request, dict):
+                await websocket.send_json({"error": "Expected a JSON object"})
+                continue
+            for action in ("subscribe", "unsubscribe"):
+                if action not in request:
+                    continue
+                requested = parse_topics(request[action])
+                if requested is None:
+                    await websocket.send_json({"error": "Invalid topic"})
+                elif (
+                    action == "subscribe"
+                    and allowed is not None
+                    and not requested <= allowed
+                ):
+                    await websocket.send_json(
+                        {"error": "Insufficient permissions"}
+                    )
+                elif action == "subscribe":
+                    subscriber.topics |= requested
+                else:
+                    subscriber.topics -= requested
+            await websocket.send_json({"topics": sorted(subscriber.topics)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        change_hub.disconnect(subscriber)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
+
+@router.get("/")
+async def list_changes(
+    response: Response,
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    current_user_id: UUID = Depends(require_admin),
+):
+    """Logged changes after ``since``; pass ``X-Last-Seq`` back to continue."""
+    changes = await change_feed.since(since, limit)
+    response.headers["X-Last-Seq"] = str(changes[-1].seq if changes else since)
+    return [change.as_dict() for change in changes]
+
+
+@router.websocket("/feed")
+async def change_feed_events(
+    websocket: WebSocket,
+    since: int | None = None,
+    current_user_id: UUID = Depends(require_admin_websocket),
+):
+    """Streams every change; with ``since``, the logged ones after it first.
+
+    Closes with 1013 when the client falls behind; reconnect with the last
+    ``seq`` received to carry on. Only the admin may connect, with a bearer
+    token in the ``Authorization`` header or the ``token`` query parameter.
+    """
+    await websocket.accept()
+    # Subscribe before reading the log, so nothing falls in between.
+    subscription = change_feed.subscribe()
+    sent = set()
+    try:
+        if since is not None:
+            while changes := await change_feed.since(since):
+                for change in changes:
+                    sent.add(change.seq)
+                    await websocket.send_json(change.as_dict())
+                since = changes[-1].seq
+        async for change in subscription:
+            if change.seq not in sent:
+                await websocket.send_json(change.as_dict())
+    except ChangeFeedLagged:
+        await websocket.close(code=1013, reason="Client too slow")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
@@ -1,49 +1,146 @@
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.emgmt.models import Department, Employee
+from src.emgmt.models import Department, DepartmentSummary, Employee
 from src.emgmt.schemas import (
     DepartmentPublic,
     DepartmentCreate,
     DepartmentUpdate,
     DepartmentPublicWithEmployees,
+    DepartmentSummaryPublic,
 )
 
-from src.emgmt.database import get_db
+from src.emgmt.broadcast import change_event, change_hub
+from src.emgmt.cache import department_list_cache
+from src.emgmt.database import get_async_db
 from src.emgmt.routers.auth import require_admin, get_authenticated_employee
+from src.emgmt.utils import encode_cursor, keyset_after
 
 router = APIRouter(prefix="/departments", tags=["departments"])
 
+SORT_KEYS = {
+    "id": [Department.id],
+    "name": [Department.name, Department.id],
+}
+
+department_list_adapter = TypeAdapter(list[DepartmentPublic])
+
+
+async def publish_change(action: str, department_id: int) -> None:
+    await change_hub.publish(
+        change_event(
+            "department",
+            action,
+            department_id,
+            department_ids=[department_id],
+        )
+    )
+
 
 @router.post("/", response_model=DepartmentPublic)
 async def add_department(
     department: DepartmentCreate,
     current_active_user: UUID = Depends(require_admin),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
     department_data = department.model_dump()
     db_department = Department(**department_data)
     session.add(db_department)
-    session.commit()
-    session.refresh(db_department)
+    await session.commit()
+    await session.refresh(db_department)
+    await department_list_cache.invalidate()
+    await publish_change("created", db_department.id)
     return db_department
 
 
 @router.get("/", response_model=list[DepartmentPublic])
 async def display_departments(
-    session: Session = Depends(get_db),
+    request: Request,
+    session: AsyncSession = Depends(get_async_db),
     offset: int = 0,
-    limit: int = Query(default=100, le=100),
+    limit: int = Query(default=100, ge=1, le=100),
+    cursor: str | None = None,
+    order_by: Literal["id", "name"] = "id",
 ):
-    departments = (
-        session.execute(select(Department).offset(offset).limit(limit))
-        .scalars()
-        .all()
+    cached, version = await department_list_cache.get(request)
+    if cached is not None:
+        return cached
+
+    sort_columns = SORT_KEYS[order_by]
+    statement = select(Department).order_by(*sort_columns).limit(limit)
+    if cursor is not None:
+        statement = statement.where(keyset_after(cursor, sort_columns))
+    else:
+        statement = statement.offset(offset)
+    departments = (await session.execute(statement)).scalars().all()
+    headers = {}
+    if len(departments) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(departments[-1], sort_columns)
+    body = department_list_adapter.dump_json(
+        department_list_adapter.validate_python(
+            departments, from_attributes=True
+        )
+    )
+    return await department_list_cache.set(request, body, headers, version)
+
+
+def summary_query():
+    # Departments created since the last refresh have no row yet.
+    return (
+        select(
+            Department.id.label("department_id"),
+            Department.name,
+            func.coalesce(DepartmentSummary.headcount, 0).label("headcount"),
+            DepartmentSummary.average_age,
+            DepartmentSummary.salary_total,
+            DepartmentSummary.salary_average,
+            DepartmentSummary.salary_min,
+            DepartmentSummary.salary_max,
+            func.coalesce(DepartmentSummary.open_tasks, 0).label("open_tasks"),
+            func.coalesce(DepartmentSummary.completed_tasks, 0).label(
+                "completed_tasks"
+            ),
+            DepartmentSummary.refreshed_at,
+        )
+        .outerjoin(DepartmentSummary)
+        .order_by(Department.id)
     )
-    return departments
+
+
+@router.get("/summary", response_model=list[DepartmentSummaryPublic])
+async def display_department_summaries(
+    offset: int = 0,
+    limit: int = Query(default=100, le=100),
+    current_active_user: UUID = Depends(require_admin),
+    session: AsyncSession = Depends(get_async_db),
+):
+    statement = summary_query().offset(offset).limit(limit)
+    return (await session.execute(statement)).mappings().all()
+
+
+@router.get("/{department_id}/summary", response_model=DepartmentSummaryPublic)
+async def get_department_summary(
+    department_id: int,
+    current_active_user: UUID = Depends(require_admin),
+    session: AsyncSession = Depends(get_async_db),
+):
+    statement = summary_query().where(Department.id == department_id)
+    summary = (await session.execute(statement)).mappings().first()
+    if not summary:
+        raise HTTPException(status_code=404, detail="Department not found.")
+    return summary
 
 
 @router.get(
@@ -52,18 +149,33 @@ async def display_departments(
 )
 async def get_department(
     department_id: int,
+    employees_cursor: str | None = None,
+    employees_limit: int = Query(default=100, ge=1, le=100),
     current_active_user: dict = Depends(get_authenticated_employee),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    current_active_user_id = current_active_user["id"]
-    department = session.get(Department, department_id)
-    current_active_user_department_id = session.execute(
-        select(Employee.department_id).where(
-            Employee.id == current_active_user_id
+    # The department, its headcount and the caller's own department come
+    # back in one query; the employees are then fetched one page at a time.
+    employee_count = (
+        select(func.count(Employee.id))
+        .where(Employee.department_id == Department.id)
+        .scalar_subquery()
+    )
+    current_active_user_department_id = (
+        select(Employee.department_id)
+        .where(Employee.id == current_active_user["id"])
+        .scalar_subquery()
+    )
+    result = (
+        await session.execute(
+            select(
+                Department, employee_count, current_active_user_department_id
+            ).where(Department.id == department_id)
         )
-    ).scalar()
-    if not department:
+    ).first()
+    if not result:
         raise HTTPException(status_code=404, detail="Department not found.")
+    department, employee_count, current_active_user_department_id = result
     if (
         current_active_user_department_id != department.id
         and current_active_user["username"] != "admin"
@@ -72,7 +184,32 @@ async def get_department(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions",
         )
-    return department
+
+    sort_columns = [Employee.id]
+    statement = (
+        select(Employee)
+        .where(Employee.department_id == department_id)
+        .order_by(*sort_columns)
+        .limit(employees_limit)
+    )
+    if employees_cursor is not None:
+        statement = statement.where(
+            keyset_after(employees_cursor, sort_columns)
+        )
+    employees = (await session.execute(statement)).scalars().all()
+
+    return {
+        **DepartmentPublic.model_validate(
+            department, from_attributes=True
+        ).model_dump(),
+        "employees": employees,
+        "employee_count": employee_count,
+        "employees_next_cursor": (
+            encode_cursor(employees[-1], sort_columns)
+            if len(employees) == employees_limit
+            else None
+        ),
+    }
 
 
 @router.patch(
@@ -83,17 +220,19 @@ async def update_department(
     department_id: int,
     updated_details: DepartmentUpdate,
     current_active_user: UUID = Depends(require_admin),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    db_department = session.get(Department, department_id)
+    db_department = await session.get(Department, department_id)
     if not db_department:
         raise HTTPException(status_code=404, detail="Department not found.")
     department_data = updated_details.model_dump(exclude_unset=True)
     for key, value in department_data.items():
         setattr(db_department, key, value)
     session.add(db_department)
-    session.commit()
-    session.refresh(db_department)
+    await session.commit()
+    await session.refresh(db_department)
+    await department_list_cache.invalidate()
+    await publish_change("updated", department_id)
     return db_department
 
 
@@ -103,11 +242,13 @@ async def update_department(
 async def delete_department(
     department_id: int,
     current_active_user: UUID = Depends(require_admin),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    department = session.get(Department, department_id)
+    department = await session.get(Department, department_id)
     if not department:
         raise HTTPException(status_code=404, detail="Department not found")
-    session.delete(department)
-    session.commit()
+    await session.delete(department)
+    await session.commit()
+    await department_list_cache.invalidate()
+    await publish_change("deleted", department_id)
     return {"message": "deleted"}
@@ -1,128 +1,240 @@
+from decimal import Decimal
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from src.emgmt.models import Employee, Department
+from src.emgmt.models import Employee, Task
 from src.emgmt.schemas import (
+    EmployeeImportError,
+    EmployeeImportReport,
     EmployeePublic,
     EmployeeCreate,
     EmployeeUpdate,
     EmployeePublicWithDepartmentAndTasks,
 )
 
-from src.emgmt.database import get_db
-from src.emgmt.utils import hash_password, check_unique_field
+from src.emgmt.broadcast import change_event, change_hub
+from src.emgmt.bulk_import import detect_format, import_employees
+from src.emgmt.cache import employee_list_cache, index_cache, principal_cache
+from src.emgmt.database import get_async_db
+from src.emgmt.utils import (
+    constraint_violation_detail,
+    encode_cursor,
+    hash_password_async,
+    keyset_after,
+)
 from src.emgmt.routers.auth import require_admin, get_authenticated_employee
 
 router = APIRouter(prefix="/employees", tags=["employees"])
 
+SORT_KEYS = {
+    "id": [Employee.id],
+    "name": [Employee.name, Employee.id],
+}
 
-def enforce_and_validate_employee_constraints_for_post(
-    session: Session, db_employee: Employee
-):
-    department_ids = session.execute(select(Department.id)).scalars().all()
-    if (
-        db_employee.department_id is not None
-        and db_employee.department_id not in department_ids
-    ):
-        raise HTTPException(
-            status_code=409, detail="Invalid department id entered."
-        )
+# Default Postgres names of the constraints created in 8b73826faeda, mapped
+# to the messages the API has always returned for them.
+CONSTRAINT_ERRORS = {
+    "employee_username_key": "Username is already in use.",
+    "employee_email_key": "Email is already in use.",
+    "employee_department_id_fkey": "Invalid department id entered.",
+}
 
-    check_unique_field(
-        session=session,
-        model=Employee,
-        field_name="username",
-        value=db_employee.username,
-        error_message="Username is already in use.",
-    )
-    check_unique_field(
-        session=session,
-        model=Employee,
-        field_name="email",
-        value=db_employee.email,
-        error_message="Email is already in use.",
-    )
+TEXT_SEARCH_FIELDS = [Employee.name, Employee.username, Employee.email]
 
+employee_list_adapter = TypeAdapter(list[EmployeePublic])
 
-def enforce_and_validate_employee_constraints_for_patch(
-    session: Session,
-    db_employee: Employee,
-    employee_id: UUID,
-):
-    department_ids = session.execute(select(Department.id)).scalars().all()
-    if (
-        db_employee.department_id is not None
-        and db_employee.department_id not in department_ids
-    ):
-        raise HTTPException(
-            status_code=409, detail="Invalid department id entered."
-        )
+MAX_REPORTED_IMPORT_ERRORS = 1000
 
-    unique_params = (
-        session.execute(
-            select(Employee.username, Employee.email).where(
-                Employee.id == employee_id
-            )
-        )
-        .first()
-        ._asdict()
-    )
 
-    if unique_params["username"] == db_employee.username:
-        pass
-    else:
-        check_unique_field(
-            session=session,
-            model=Employee,
-            field_name="username",
-            value=db_employee.username,
-            error_message="Username is already in use.",
-        )
+async def invalidate_listings() -> None:
+    await index_cache.invalidate()
+    await employee_list_cache.invalidate()
 
-    if unique_params["email"] == db_employee.email:
-        pass
-    else:
-        check_unique_field(
-            session=session,
-            model=Employee,
-            field_name="email",
-            value=db_employee.email,
-            error_message="Email is already in use.",
+
+async def publish_change(
+    action: str, employee_id: UUID, *department_ids: int | None
+) -> None:
+    await change_hub.publish(
+        change_event(
+            "employee",
+            action,
+            employee_id,
+            department_ids=department_ids,
+            employee_ids=[employee_id],
         )
+    )
 
 
 @router.post("/", response_model=EmployeePublic)
 async def add_employee(
     employee: EmployeeCreate,
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
     current_user_id: UUID = Depends(require_admin),
 ):
     employee_data = employee.model_dump(exclude_unset=True)
     password = employee_data.pop("password")
-    db_employee = Employee(
-        hashed_password=hash_password(password), **employee_data
-    )
-    enforce_and_validate_employee_constraints_for_post(session, db_employee)
-    session.add(db_employee)
-    session.commit()
-    session.refresh(db_employee)
+    employee_data["hashed_password"] = await hash_password_async(password)
+    # The unique and foreign key constraints do the validation, so a create
+    # is a single INSERT ... RETURNING.
+    statement = insert(Employee).values(**employee_data).returning(Employee)
+    try:
+        db_employee = (await session.execute(statement)).scalar_one()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=constraint_violation_detail(e, CONSTRAINT_ERRORS),
+        )
+    await invalidate_listings()
+    await publish_change("created", db_employee.id, db_employee.department_id)
     return db_employee
 
 
+@router.post("/import", response_model=EmployeeImportReport)
+async def import_employees_file(
+    file: UploadFile = File(...),
+    file_format: Literal["csv", "jsonl"] | None = Query(
+        default=None, alias="format"
+    ),
+    batch_size: int = Query(default=5000, ge=1, le=50000),
+    current_user_id: UUID = Depends(require_admin),
+):
+    if file_format is None:
+        try:
+            file_format = detect_format(file.filename)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    report = EmployeeImportReport(total=0, inserted=0, rejected=0)
+
+    def collect_error(line: int, error: str) -> None:
+        if len(report.errors) < MAX_REPORTED_IMPORT_ERRORS:
+            report.errors.append(EmployeeImportError(line=line, error=error))
+        else:
+            report.errors_truncated = True
+
+    summary = await run_in_threadpool(
+        import_employees,
+        file.file,
+        file_format,
+        collect_error,
+        batch_size=batch_size,
+    )
+    if summary.inserted:
+        await invalidate_listings()
+    report.total = summary.total
+    report.inserted = summary.inserted
+    report.rejected = summary.rejected
+    return report
+
+
 @router.get("/", response_model=list[EmployeePublic])
 async def display_employees(
+    request: Request,
+    offset: int = 0,
+    limit: int = Query(default=100, ge=1, le=100),
+    cursor: str | None = None,
+    order_by: Literal["id", "name"] = "id",
+    session: AsyncSession = Depends(get_async_db),
+):
+    cached, version = await employee_list_cache.get(request)
+    if cached is not None:
+        return cached
+
+    sort_columns = SORT_KEYS[order_by]
+    statement = select(Employee).order_by(*sort_columns).limit(limit)
+    if cursor is not None:
+        statement = statement.where(keyset_after(cursor, sort_columns))
+    else:
+        statement = statement.offset(offset)
+    employees = (await session.execute(statement)).scalars().all()
+    headers = {}
+    if len(employees) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(employees[-1], sort_columns)
+    body = employee_list_adapter.dump_json(
+        employee_list_adapter.validate_python(employees, from_attributes=True)
+    )
+    return await employee_list_cache.set(request, body, headers, version)
+
+
+@router.get("/search", response_model=list[EmployeePublic])
+async def search_employees(
+    q: str | None = Query(
+        default=None,
+        min_length=1,
+        description="Matched against name, username and email.",
+    ),
+    match: Literal["prefix", "substring"] = "substring",
+    department_id: int | None = None,
+    role: str | None = None,
+    min_age: int | None = None,
+    max_age: int | None = None,
+    min_salary: Decimal | None = None,
+    max_salary: Decimal | None = None,
+    order_by: Literal[
+        "name", "username", "email", "age", "salary", "department_id", "id"
+    ] = "name",
+    descending: bool = False,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
-    session: Session = Depends(get_db),
+    current_user_id: UUID = Depends(require_admin),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    employees = (
-        session.execute(select(Employee).offset(offset).limit(limit))
-        .scalars()
-        .all()
+    statement = select(Employee)
+
+    if q is not None:
+        # Both patterns are served by the trigram indexes on these columns.
+        escaped = (
+            q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        pattern = f"{escaped}%" if match == "prefix" else f"%{escaped}%"
+        statement = statement.where(
+            or_(
+                *(
+                    field.ilike(pattern, escape="\\")
+                    for field in TEXT_SEARCH_FIELDS
+                )
+            )
+        )
+    if department_id is not None:
+        statement = statement.where(Employee.department_id == department_id)
+    if role is not None:
+        statement = statement.where(Employee.role == role)
+    if min_age is not None:
+        statement = statement.where(Employee.age >= min_age)
+    if max_age is not None:
+        statement = statement.where(Employee.age <= max_age)
+    if min_salary is not None:
+        statement = statement.where(Employee.salary >= min_salary)
+    if max_salary is not None:
+        statement = statement.where(Employee.salary <= max_salary)
+
+    sort_column = getattr(Employee, order_by)
+    sort_column = sort_column.desc() if descending else sort_column.asc()
+    statement = (
+        statement.order_by(sort_column.nulls_last(), Employee.id)
+        .offset(offset)
+        .limit(limit)
     )
+    employees = (await session.execute(statement)).scalars().all()
     return employees
 
 
@@ -132,12 +244,25 @@ async def display_employees(
 )
 async def get_employee(
     employee_id: UUID,
+    tasks_cursor: str | None = None,
+    tasks_limit: int = Query(default=100, ge=1, le=100),
     current_active_user: UUID = Depends(get_authenticated_employee),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
     current_active_user_id = current_active_user["id"]
-    employee = session.get(Employee, employee_id)
-    if not employee:
+    task_count = (
+        select(func.count(Task.id))
+        .where(Task.employee_id == Employee.id)
+        .scalar_subquery()
+    )
+    result = (
+        await session.execute(
+            select(Employee, task_count)
+            .options(joinedload(Employee.department))
+            .where(Employee.id == employee_id)
+        )
+    ).first()
+    if not result:
         raise HTTPException(status_code=404, detail="Employee not found.")
     if (
         current_active_user_id != employee_id
@@ -147,7 +272,32 @@ async def get_employee(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions",
         )
-    return employee
+    employee, task_count = result
+
+    sort_columns = [Task.id]
+    statement = (
+        select(Task)
+        .where(Task.employee_id == employee_id)
+        .order_by(*sort_columns)
+        .limit(tasks_limit)
+    )
+    if tasks_cursor is not None:
+        statement = statement.where(keyset_after(tasks_cursor, sort_columns))
+    tasks = (await session.execute(statement)).scalars().all()
+
+    return {
+        **EmployeePublic.model_validate(
+            employee, from_attributes=True
+        ).model_dump(),
+        "department": employee.department,
+        "tasks": tasks,
+        "task_count": task_count,
+        "tasks_next_cursor": (
+            encode_cursor(tasks[-1], sort_columns)
+            if len(tasks) == tasks_limit
+            else None
+        ),
+    }
 
 
 @router.patch(
@@ -158,24 +308,53 @@ async def update_employee(
     updated_details: EmployeeUpdate,
     employee_id: UUID,
     current_user_id: UUID = Depends(require_admin),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    db_employee = session.get(Employee, employee_id)
-    if not db_employee:
-        raise HTTPException(status_code=404, detail="Employee not found.")
     employee_data = updated_details.model_dump(exclude_unset=True)
     if "password" in employee_data:
-        db_employee.hashed_password = hash_password(
+        employee_data["hashed_password"] = await hash_password_async(
             employee_data.pop("password")
         )
-        for key, value in employee_data.items():
-            setattr(db_employee, key, value)
-    enforce_and_validate_employee_constraints_for_patch(
-        session, db_employee, employee_id
+    if not employee_data:
+        db_employee = await session.get(Employee, employee_id)
+        if not db_employee:
+            raise HTTPException(status_code=404, detail="Employee not found.")
+        return db_employee
+
+    # Subqueries in RETURNING read the snapshot taken before the update, so
+    # this is the department the employee is moving out of.
+    previous_department_id = (
+        select(Employee.department_id)
+        .where(Employee.id == employee_id)
+        .scalar_subquery()
+    )
+    statement = (
+        update(Employee)
+        .where(Employee.id == employee_id)
+        .values(**employee_data)
+        .returning(Employee, previous_department_id)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        row = (await session.execute(statement)).one_or_none()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=constraint_violation_detail(e, CONSTRAINT_ERRORS),
+        )
+    if not row:
+        raise HTTPException(status_code=404, detail="Employee not found.")
+    db_employee, previous_department_id = row
+    await principal_cache.invalidate(employee_id)
+    await invalidate_listings()
+    await publish_change(
+        "updated",
+        employee_id,
+        db_employee.department_id,
+        previous_department_id,
     )
-    session.add(db_employee)
-    session.commit()
-    session.refresh(db_employee)
     return db_employee
 
 
@@ -185,11 +364,14 @@ async def update_employee(
 async def delete_employee(
     employee_id: UUID,
     current_user_id: UUID = Depends(require_admin),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    employee = session.get(Employee, employee_id)
+    employee = await session.get(Employee, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
-    session.delete(employee)
-    session.commit()
+    await session.delete(employee)
+    await session.commit()
+    await principal_cache.invalidate(employee_id)
+    await invalidate_listings()
+    await publish_change("deleted", employee_id, employee.department_id)
     return {"message": "deleted"}
@@ -0,0 +1,88 @@
+from typing import Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from src.emgmt.config import settings
+from src.emgmt.database import async_engine, engine
+from src.emgmt.export import ExportStream, RowWriter, build_export_query
+from src.emgmt.routers.auth import require_admin
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Rows fetched per round-trip from the server-side cursor
+FETCH_SIZE = 1000
+
+
+async def stream_export_async(statement: Select, stream: ExportStream):
+    async with async_engine.connect() as connection:
+        result = await connection.stream(
+            statement.execution_options(yield_per=FETCH_SIZE)
+        )
+        async for row in result:
+            if chunk := stream.feed(row):
+                yield chunk
+    yield stream.finish()
+
+
+def stream_export_sync(statement: Select, stream: ExportStream):
+    # StreamingResponse iterates sync generators in the threadpool.
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=FETCH_SIZE).execute(
+            statement
+        )
+        for row in result:
+            if chunk := stream.feed(row):
+                yield chunk
+    yield stream.finish()
+
+
+@router.get("/{tablename}")
+async def export_table(
+    tablename: Literal["department", "employee", "task"],
+    file_format: Literal["ndjson", "csv"] = Query(
+        default="ndjson", alias="format"
+    ),
+    columns: str | None = Query(
+        default=None, description="Comma separated, e.g. id,name."
+    ),
+    filters: list[str] = Query(
+        default=[],
+        alias="filter",
+        description="Such as department_id=3 or age>=30; may be repeated.",
+    ),
+    compress: bool = Query(default=False, description="Gzip the export."),
+    current_user_id: UUID = Depends(require_admin),
+):
+    try:
+        statement = build_export_query(
+            tablename, columns.split(",") if columns else None, filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    writer = RowWriter(
+        list(statement.selected_columns.keys()),
+        "jsonl" if file_format == "ndjson" else "csv",
+    )
+    stream = ExportStream(writer, compress)
+    content = (
+        stream_export_async(statement, stream)
+        if settings.DB_ASYNC
+        else stream_export_sync(statement, stream)
+    )
+
+    filename = f"{tablename}.{file_format}"
+    media_type = MEDIA_TYPES[file_format]
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,108 @@
+import json
+from uuid import UUID
+
+from celery import states
+from celery.result import AsyncResult
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
+
+from src.emgmt.cache import redis_client
+from src.emgmt.celery import celery, create_task, job_channel, job_event
+from src.emgmt.config import settings
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _job_key(job_id: UUID) -> str:
+    return f"emgmt:job:{job_id}"
+
+
+def read_job_status(job_id: UUID) -> dict:
+    # Reads the result backend synchronously; call it in the threadpool.
+    result = AsyncResult(str(job_id), app=celery)
+    error = repr(result.result) if result.state == states.FAILURE else None
+    return job_event(str(job_id), result.state, result.result, error)
+
+
+async def ensure_job_exists(job_id: UUID) -> None:
+    if not await redis_client.exists(_job_key(job_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found or expired",
+        )
+
+
+async def submit_job(request: Request, delay: int, x: int, y: int) -> dict:
+    # Publishing to the broker is blocking I/O.
+    task = await run_in_threadpool(create_task.delay, delay, x, y)
+    await redis_client.set(
+        _job_key(task.id), "create task", ex=settings.JOB_RESULT_TTL
+    )
+    return {
+        "job_id": task.id,
+        "status": states.PENDING,
+        "status_url": str(request.url_for("get_job", job_id=task.id)),
+    }
+
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
+async def create_job(request: Request, delay: int, x: int, y: int):
+    return await submit_job(request, delay, x, y)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: UUID):
+    await ensure_job_exists(job_id)
+    return await run_in_threadpool(read_job_status, job_id)
+
+
+@router.delete("/{job_id}", status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(job_id: UUID):
+    await ensure_job_exists(job_id)
+    job = await run_in_threadpool(read_job_status, job_id)
+    if job["status"] in states.READY_STATES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already finished with status {job['status']}",
+        )
+    # A queued job is discarded when a worker receives it; a running one is
+    # terminated.
+    await run_in_threadpool(celery.control.revoke, str(job_id), terminate=True)
+    return job_event(str(job_id), "REVOKING")
+
+
+@router.websocket("/{job_id}/events")
+async def job_events(websocket: WebSocket, job_id: UUID):
+    """Sends the current status, then each change until the job finishes."""
+    await websocket.accept()
+    try:
+        if not await redis_client.exists(_job_key(job_id)):
+            await websocket.close(code=4404, reason="Job not found or expired")
+            return
+        async with redis_client.pubsub() as pubsub:
+            # Subscribe before reading the status so no event is missed.
+            await pubsub.subscribe(job_channel(str(job_id)))
+            job = await run_in_threadpool(read_job_status, job_id)
+            await websocket.send_json(job)
+            if job["status"] not in states.READY_STATES:
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    job = json.loads(message["data"])
+                    await websocket.send_json(job)
+                    if job["status"] in states.READY_STATES:
+                        break
+    except WebSocketDisconnect:
+        return
+    except RedisError:
+        await websocket.close(code=1011, reason="Job events unavailable")
+        return
+    await websocket.close()
@@ -0,0 +1,64 @@
+from uuid import UUID
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.emgmt.database import get_async_db
+from src.emgmt.models import Task
+from src.emgmt.routers.auth import get_authenticated_employee
+from src.emgmt.schemas import TaskPublic
+from src.emgmt.utils import encode_cursor, keyset_after
+
+router = APIRouter(prefix="/tasks", tags=["tasks"])
+
+SORT_COLUMNS = [Task.id]
+
+
+@router.get("/", response_model=list[TaskPublic])
+async def display_tasks(
+    response: Response,
+    employee_id: UUID | None = Query(
+        default=None, description="Defaults to your own tasks."
+    ),
+    completed: bool | None = None,
+    limit: int = Query(default=100, ge=1, le=100),
+    cursor: str | None = None,
+    current_active_user: dict = Depends(get_authenticated_employee),
+    session: AsyncSession = Depends(get_async_db),
+):
+    """Lists tasks by id; the admin may list anyone's, or everyone's."""
+    is_admin = current_active_user["role"] == "admin"
+    if employee_id is None and not is_admin:
+        employee_id = current_active_user["id"]
+    if employee_id != current_active_user["id"] and not is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions",
+        )
+
+    # Served by ix_task_employee_id_id, or ix_task_open_employee_id_id for
+    # completed=false.
+    statement = select(Task).order_by(*SORT_COLUMNS).limit(limit)
+    if employee_id is not None:
+        statement = statement.where(Task.employee_id == employee_id)
+    if completed is not None:
+        # Written as NOT completed so the partial index matches it.
+        statement = statement.where(
+            Task.completed if completed else ~Task.completed
+        )
+    if cursor is not None:
+        statement = statement.where(keyset_after(cursor, SORT_COLUMNS))
+    tasks = (await session.execute(statement)).scalars().all()
+    if len(tasks) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            tasks[-1], SORT_COLUMNS
+        )
+    return tasks
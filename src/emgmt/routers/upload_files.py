@@ -1,25 +1,28 @@
-from fastapi import APIRouter, File, UploadFile, Form
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile, status
+
+from src.emgmt.config import settings
+from src.emgmt.schemas import StoredFile, StoredFiles
+from src.emgmt.storage import UploadBudget, content_store
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 
-@router.post("/single_file/")
+@router.post("/single_file/", response_model=StoredFile)
 async def upload_file(file: UploadFile = File(...)):
-    content = await file.read()
-    with open(file.filename, "wb") as f:
-        f.write(content)
-    return {"filename": file.filename}
+    budget = UploadBudget(settings.UPLOAD_MAX_BYTES)
+    return await content_store.save(file, budget)
 
 
-@router.post("/multiple_files/")
+@router.post("/multiple_files/", response_model=StoredFiles)
 async def upload_files(files: list[UploadFile] = File(...)):
-    filenames = []
-    for file in files:
-        content = await file.read()
-        with open(file.filename, "wb") as f:
-            f.write(content)
-        filenames.append(file.filename)
-    return {"filenames": filenames}
+    if len(files) > settings.UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.UPLOAD_MAX_FILES} files per request",
+        )
+    budget = UploadBudget(settings.UPLOAD_MAX_BYTES)
+    stored = await content_store.save_all(files, budget)
+    return {"filenames": [f.filename for f in stored], "files": stored}
 
 
 @router.post("/files_and_forms/")
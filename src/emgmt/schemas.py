@@ -1,8 +1,9 @@
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
+from typing import Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 
 # --- Department Schemas ---
 
@@ -31,7 +32,25 @@ class DepartmentUpdate(BaseModel):
 
 
 class DepartmentPublicWithEmployees(DepartmentPublic):
+    # One page of the department's employees, see ``employees_next_cursor``
     employees: list["EmployeePublic"] = Field(default_factory=list)
+    employee_count: int = 0
+    employees_next_cursor: str | None = None
+
+
+class DepartmentSummaryPublic(BaseModel):
+    department_id: int
+    name: str
+    headcount: int
+    average_age: Decimal | None
+    salary_total: Decimal | None
+    salary_average: Decimal | None
+    salary_min: Decimal | None
+    salary_max: Decimal | None
+    open_tasks: int
+    completed_tasks: int
+    # None until the first refresh after the department was created
+    refreshed_at: datetime | None
 
 
 # --- Employee Schemas ---
@@ -51,6 +70,12 @@ class EmployeeCreate(EmployeeBase):
     password: str
 
 
+class EmployeeImport(EmployeeBase):
+    # Files may leave optional cells blank or drop the column altogether.
+    salary: Decimal | None = Field(default=None)
+    password: str | None = Field(default=None)
+
+
 class EmployeePublic(EmployeeBase):
     id: UUID
 
@@ -69,6 +94,8 @@ class EmployeePublicWithDepartmentAndTasks(EmployeePublic):
     department: DepartmentPublic | None = None
     # tasks: list["TaskPublic"] = Field(default_factory=list)
     tasks: list["TaskPublic"] = Field(default_factory=list)
+    task_count: int = 0
+    tasks_next_cursor: str | None = None
 
     # # class based config deprecated in Pydantic V2, will be removed in V3
     # class Config:
@@ -77,6 +104,19 @@ class EmployeePublicWithDepartmentAndTasks(EmployeePublic):
     model_config = ConfigDict(from_attributes=True)
 
 
+class EmployeeImportError(BaseModel):
+    line: int
+    error: str
+
+
+class EmployeeImportReport(BaseModel):
+    total: int
+    inserted: int
+    rejected: int
+    errors: list[EmployeeImportError] = Field(default_factory=list)
+    errors_truncated: bool = False
+
+
 # --- Task Schemas ---
 
 
@@ -92,6 +132,42 @@ class TaskPublic(TaskBase):
     id: int
 
 
+class TaskOperation(BaseModel):
+    """One line of a ``tasks batch`` file."""
+
+    op: Literal["add", "update", "delete", "complete"]
+    username: str
+    task_id: int | None = None
+    title: str | None = None
+    description: str | None = None
+    completed: bool | None = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op == "add" and self.title is None:
+            raise ValueError("title is required to add a task")
+        if self.op != "add" and self.task_id is None:
+            raise ValueError(f"task_id is required to {self.op} a task")
+        return self
+
+
+# --- File Schemas ---
+
+
+class StoredFile(BaseModel):
+    filename: str | None
+    content_type: str | None
+    sha256: str
+    size: int
+    # True when identical content was already stored
+    deduplicated: bool
+
+
+class StoredFiles(BaseModel):
+    filenames: list[str | None]
+    files: list[StoredFile]
+
+
 # --- Forward References ---
 DepartmentPublicWithEmployees.model_rebuild()
 EmployeePublicWithDepartmentAndTasks.model_rebuild()
@@ -0,0 +1,108 @@
+"""Content-addressed storage for uploaded files.
+
+Uploads are copied to a temporary file in fixed-size chunks, hashed on the
+way, and then linked to ``<root>/<sha[:2]>/<sha[2:4]>/<sha>``. Storing the
+same content twice keeps the first copy and drops the new one.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from src.emgmt.config import settings
+from src.emgmt.schemas import StoredFile
+
+
+class UploadBudget:
+    """Byte allowance shared by all the files of one request."""
+
+    def __init__(self, max_bytes: int):
+        self.remaining = max_bytes
+
+    def consume(self, size: int):
+        self.remaining -= size
+        if self.remaining < 0:
+            raise HTTPException(
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail="Upload exceeds the size limit",
+            )
+
+
+class ContentStore:
+    def __init__(self, root: str | Path, chunk_size: int):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def _open_temp(self):
+        incoming = self.root / "incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=incoming)
+        return os.fdopen(fd, "wb"), name
+
+    def _commit(self, temp_name: str, sha256: str) -> bool:
+        """Moves the temp file into place; returns True if it was a dup."""
+        path = self.path_for(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Linking fails if the path exists, so of several concurrent uploads
+        # of the same content exactly one claims it. Readers never see a
+        # partial file either way.
+        try:
+            os.link(temp_name, path)
+        except FileExistsError:
+            return True
+        finally:
+            os.unlink(temp_name)
+        return False
+
+    async def save(self, file: UploadFile, budget: UploadBudget) -> StoredFile:
+        out, temp_name = await run_in_threadpool(self._open_temp)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            try:
+                while chunk := await file.read(self.chunk_size):
+                    budget.consume(len(chunk))
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await run_in_threadpool(out.write, chunk)
+            finally:
+                await run_in_threadpool(out.close)
+            sha256 = digest.hexdigest()
+            deduplicated = await run_in_threadpool(
+                self._commit, temp_name, sha256
+            )
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+            raise
+        return StoredFile(
+            filename=file.filename,
+            content_type=file.content_type,
+            sha256=sha256,
+            size=size,
+            deduplicated=deduplicated,
+        )
+
+    async def save_all(
+        self, files: list[UploadFile], budget: UploadBudget
+    ) -> list[StoredFile]:
+        """Writes the files concurrently; one failure cancels the rest."""
+        tasks = [asyncio.create_task(self.save(f, budget)) for f in files]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+content_store = ContentStore(settings.UPLOAD_DIR, settings.UPLOAD_CHUNK_SIZE)
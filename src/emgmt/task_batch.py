@@ -0,0 +1,253 @@
+"""Batch task operations.
+
+Operations are streamed from a CSV or JSONL file and applied one chunk per
+transaction. Each chunk resolves its usernames and task ids with one query
+apiece, then runs each kind of operation as a single statement. Operations
+on a task already touched earlier in the same chunk start a new group, so
+the file order is kept. Failed lines are reported through a callback and do
+not stop the rest of the file. After each chunk commits, one change event
+names the employees and departments whose tasks it changed.
+"""
+
+from dataclasses import dataclass
+from itertools import islice
+from typing import BinaryIO, Callable, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import (
+    Boolean,
+    Integer,
+    String,
+    Text,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from src.emgmt.broadcast import change_event, publish_sync
+from src.emgmt.bulk_import import read_rows
+from src.emgmt.database import engine
+from src.emgmt.models import Employee, Task
+from src.emgmt.schemas import TaskOperation
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    applied: int = 0
+    failed: int = 0
+
+
+def _validate(row: dict | None) -> tuple[TaskOperation | None, str | None]:
+    if row is None:
+        return None, "Row is not a JSON object."
+    try:
+        return TaskOperation.model_validate(row), None
+    except ValidationError as e:
+        return None, "; ".join(
+            (
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                if error["loc"]
+                else error["msg"]
+            )
+            for error in e.errors()
+        )
+
+
+def _groups(
+    operations: list[tuple[int, TaskOperation]],
+) -> Iterator[list[tuple[int, TaskOperation]]]:
+    """Split a chunk so that no task id appears twice in a group."""
+    group, seen = [], set()
+    for line, operation in operations:
+        if operation.task_id is not None and operation.task_id in seen:
+            yield group
+            group, seen = [], set()
+        group.append((line, operation))
+        if operation.task_id is not None:
+            seen.add(operation.task_id)
+    if group:
+        yield group
+
+
+def _apply_group(
+    connection: Connection,
+    group: list[tuple[int, TaskOperation, object]],
+    on_error: Callable[[int, str], None],
+) -> tuple[int, int]:
+    """Apply one group of operations whose employees are already resolved."""
+    task_ids = [op.task_id for _, op, _ in group if op.task_id is not None]
+    owners = dict(
+        connection.execute(
+            select(Task.id, Task.employee_id).where(Task.id.in_(task_ids))
+        ).all()
+        if task_ids
+        else []
+    )
+
+    rejected = set()
+    adds, updates, completes, deletes = [], [], [], []
+    for line, operation, employee_id in group:
+        if operation.op == "add":
+            adds.append(
+                {
+                    "title": operation.title,
+                    "description": operation.description,
+                    "completed": bool(operation.completed),
+                    "employee_id": employee_id,
+                }
+            )
+            continue
+        if owners.get(operation.task_id) != employee_id:
+            rejected.add(line)
+            on_error(line, "Invalid task id for this employee.")
+        elif operation.op == "update":
+            updates.append(operation)
+        elif operation.op == "complete":
+            completes.append(operation.task_id)
+        else:
+            deletes.append(operation.task_id)
+
+    applied = [line for line, _, _ in group if line not in rejected]
+    try:
+        # A failing statement only discards this group.
+        with connection.begin_nested():
+            if adds:
+                connection.execute(insert(Task), adds)
+            if updates:
+                changes = values(
+                    column("id", Integer),
+                    column("title", String),
+                    column("description", Text),
+                    column("completed", Boolean),
+                    name="changes",
+                ).data(
+                    [
+                        (op.task_id, op.title, op.description, op.completed)
+                        for op in updates
+                    ]
+                )
+                # Fields left out of a line keep their current value. The
+                # casts type columns whose values are all NULL.
+                connection.execute(
+                    update(Task)
+                    .where(Task.id == changes.c.id)
+                    .values(
+                        title=func.coalesce(
+                            cast(changes.c.title, String), Task.title
+                        ),
+                        description=func.coalesce(
+                            cast(changes.c.description, Text),
+                            Task.description,
+                        ),
+                        completed=func.coalesce(
+                            cast(changes.c.completed, Boolean), Task.completed
+                        ),
+                    )
+                )
+            if completes:
+                connection.execute(
+                    update(Task)
+                    .where(Task.id.in_(completes))
+                    .values(completed=True)
+                )
+            if deletes:
+                connection.execute(delete(Task).where(Task.id.in_(deletes)))
+    except DBAPIError as e:
+        for line in applied:
+            on_error(line, str(e.orig).strip())
+        return 0, len(group)
+    return len(applied), len(rejected)
+
+
+def apply_task_operations(
+    file: BinaryIO,
+    file_format: str,
+    on_error: Callable[[int, str], None],
+    on_batch: Callable[[BatchSummary], None] | None = None,
+    batch_size: int = 1000,
+) -> BatchSummary:
+    """Apply the operations in ``file``, committing one chunk at a time.
+
+    ``on_error`` is called with the line number and reason of every failed
+    operation, and ``on_batch`` with the running totals after each chunk.
+    """
+    summary = BatchSummary()
+    rows = read_rows(file, file_format)
+    # Usernames resolved by earlier chunks; None marks an unknown username.
+    employee_ids: dict[str, object] = {}
+    department_ids: dict[object, int | None] = {}
+
+    with engine.connect() as connection:
+        while chunk := list(islice(rows, batch_size)):
+            operations = []
+            for line, row in chunk:
+                summary.total += 1
+                operation, error = _validate(row)
+                if error is not None:
+                    summary.failed += 1
+                    on_error(line, error)
+                else:
+                    operations.append((line, operation))
+
+            changed = set()
+            with connection.begin():
+                unknown = {op.username for _, op in operations}.difference(
+                    employee_ids
+                )
+                if unknown:
+                    employee_ids.update(dict.fromkeys(unknown))
+                    for (
+                        username,
+                        employee_id,
+                        department_id,
+                    ) in connection.execute(
+                        select(
+                            Employee.username,
+                            Employee.id,
+                            Employee.department_id,
+                        ).where(Employee.username.in_(unknown))
+                    ):
+                        employee_ids[username] = employee_id
+                        department_ids[employee_id] = department_id
+
+                for group in _groups(operations):
+                    resolved = []
+                    for line, operation in group:
+                        employee_id = employee_ids[operation.username]
+                        if employee_id is None:
+                            summary.failed += 1
+                            on_error(line, "Invalid username.")
+                        else:
+                            resolved.append((line, operation, employee_id))
+                    if not resolved:
+                        continue
+                    applied, failed = _apply_group(
+                        connection, resolved, on_error
+                    )
+                    summary.applied += applied
+                    summary.failed += failed
+                    if applied:
+                        changed.update(employee for _, _, employee in resolved)
+
+            if changed:
+                publish_sync(
+                    change_event(
+                        "task",
+                        "changed",
+                        department_ids=[department_ids[e] for e in changed],
+                        employee_ids=list(changed),
+                    )
+                )
+
+            if on_batch is not None:
+                on_batch(summary)
+
+    return summary
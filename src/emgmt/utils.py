@@ -1,3 +1,6 @@
+import asyncio
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json
 from typing_extensions import TypeVar
@@ -8,9 +11,9 @@ from httpx import AsyncClient
 import jwt
 from jwt.exceptions import InvalidTokenError
 from passlib.hash import pbkdf2_sha256
-from sqlalchemy import Result, select
+from sqlalchemy import ColumnElement, select, tuple_
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.emgmt.config import settings
 from src.emgmt.database import get_db
@@ -19,36 +22,139 @@ from src.emgmt.models import Base, Employee
 T = TypeVar("T")
 
 
+password_hasher = pbkdf2_sha256.using(
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+    salt_size=settings.PASSWORD_HASH_SALT_SIZE,
+)
+
+
+class HashingPool:
+    """Runs password hashing on dedicated threads, off the event loop.
+
+    At most ``workers`` hashes run at once and up to ``queue_limit`` more may
+    wait for a thread; anything beyond that is rejected straight away so a
+    login burst cannot pile up unbounded work.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+
+    async def run(self, func, *args):
+        if self.pending >= self.workers + self.queue_limit:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+
+hashing_pool = HashingPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
+
+
 def hash_password(password: str) -> str:
-    return pbkdf2_sha256.hash(password)
+    return password_hasher.hash(password)
 
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    return pbkdf2_sha256.verify(password, hashed_password)
+    return password_hasher.verify(password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    params = pbkdf2_sha256.from_string(hashed_password)
+    return (
+        params.rounds != settings.PASSWORD_HASH_ROUNDS
+        or len(params.salt) != settings.PASSWORD_HASH_SALT_SIZE
+    )
 
 
-def save_result_to_json(result: Result, filename: str) -> None:
-    columns = result.keys
-    data = [dict(zip(columns, row)) for row in result.fetchall()]
-    json_data = json.dumps(data, indent=4)
+def verify_and_update_password(
+    password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify ``password`` and return a new hash if the stored one is stale."""
+    if not verify_password(password, hashed_password):
+        return False, None
+    if password_needs_rehash(hashed_password):
+        return True, hash_password(password)
+    return True, None
 
-    with open(f"../data/{filename}.json", "w") as file:
-        file.write(json_data)
 
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(hash_password, password)
 
-def check_unique_field(
-    session: Session,
+
+async def verify_and_update_password_async(
+    password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return await hashing_pool.run(
+        verify_and_update_password, password, hashed_password
+    )
+
+
+async def check_unique_field(
+    session: AsyncSession,
     model: Base,
     field_name: str,
     value: T,
     error_message: str = "One or more fields have entries that already exist.",
 ) -> None:
     statement = select(model).where(getattr(model, field_name) == value)
-    result = session.execute(statement).first()
+    result = (await session.execute(statement)).first()
     if result:
         raise HTTPException(status_code=409, detail=error_message)
 
 
+def constraint_violation_detail(
+    error: IntegrityError,
+    messages: dict[str, str],
+    default: str = "One or more fields violate a database constraint.",
+) -> str:
+    """Message for the constraint behind ``error``, looked up by its name."""
+    # psycopg2 exposes the name on the diagnostics, asyncpg on the cause.
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        name = diag.constraint_name
+    else:
+        name = getattr(error.orig.__cause__, "constraint_name", None)
+    return messages.get(name, default)
+
+
+def encode_cursor(row, columns: list) -> str:
+    """Opaque cursor holding ``row``'s values for the sort ``columns``."""
+    key = [str(getattr(row, column.key)) for column in columns]
+    return urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def keyset_after(cursor: str, columns: list) -> ColumnElement[bool]:
+    """Filter selecting the rows that sort after ``cursor`` on ``columns``.
+
+    The row-value comparison lets Postgres seek straight to the cursor on an
+    index over ``columns``, however deep the page is.
+    """
+    try:
+        key = json.loads(urlsafe_b64decode(cursor))
+        values = [
+            column.type.python_type(value)
+            for column, value in zip(columns, key, strict=True)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return tuple_(*columns) > tuple_(*values)
+
+
 def create_access_token(
     data: dict,
     expiry: timedelta = None,
@@ -148,12 +254,6 @@ async def get_client():
         yield client
 
 
-def write_notification(email: str, message=""):
-    with open("log.txt", mode="w") as email_file:
-        content = f"notification for {email}: {message}"
-        email_file.write(content)
-
-
 html = """
 <!DOCTYPE html>
 <html>
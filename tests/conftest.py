@@ -1,18 +1,43 @@
 from fastapi.testclient import TestClient
 import pytest
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 
-from src.emgmt.database import get_db
+from src.emgmt.database import get_async_db
 from src.emgmt.main import app
 
-mock_session = Mock()
+mock_session = AsyncMock()
+mock_session.add = Mock()
 
 
-def get_mock_session():
+async def get_mock_session():
     yield mock_session
 
 
-app.dependency_overrides[get_db] = get_mock_session
+app.dependency_overrides[get_async_db] = get_mock_session
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--query-plans",
+        action="store_true",
+        help="Run the query plan checks against the configured Postgres. "
+        "They seed a scratch schema and take a while.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_plans: needs Postgres, run with --query-plans"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--query-plans"):
+        return
+    skip = pytest.mark.skip(reason="needs --query-plans")
+    for item in items:
+        if "query_plans" in item.keywords:
+            item.add_marker(skip)
 
 
 @pytest.fixture
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import fakeredis
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from src.emgmt.broadcast import BroadcastHub, change_event
+from src.emgmt.main import app
+from src.emgmt.routers.auth import get_websocket_employee
+
+
+def test_slow_clients_are_coalesced_then_dropped():
+    async def scenario():
+        hub = BroadcastHub(fakeredis.FakeAsyncRedis(), queue_size=2)
+        employee_id = uuid4()
+        fast = hub.connect({"department:1"})
+        slow = hub.connect({"department:1", f"employee:{employee_id}"})
+        other = hub.connect({"department:2"})
+
+        def send(**kwargs):
+            hub.deliver(
+                json.dumps(change_event("employee", "updated", **kwargs))
+            )
+
+        send(department_ids=[1])
+        assert await fast.next_message() is not None
+        send(department_ids=[1], employee_ids=[employee_id])
+        assert await fast.next_message() is not None
+        # The slow client's queue is full: both events and the new one
+        # collapse into one resync message.
+        send(department_ids=[1])
+        assert await fast.next_message() is not None
+        assert json.loads(await slow.next_message()) == {
+            "action": "resync",
+            "topics": ["department:1", f"employee:{employee_id}"],
+        }
+        assert slow.queue.empty() and other.queue.empty()
+        assert hub.stats() == {"connections": 3, "coalesced": 1, "dropped": 0}
+
+        # Overflowing again before the resync is read drops the client.
+        hub.disconnect(fast)
+        for _ in range(3):
+            send(department_ids=[1])
+        assert hub.stats()["coalesced"] == 2
+        for _ in range(3):
+            send(department_ids=[1])
+        assert hub.stats() == {"connections": 1, "coalesced": 2, "dropped": 1}
+        assert await slow.next_message() is None
+
+    asyncio.run(scenario())
+
+
+def test_change_events_subscriptions(test_client):
+    app.dependency_overrides[get_websocket_employee] = lambda: {
+        "id": uuid4(),
+        "role": "admin",
+        "username": "admin",
+    }
+    try:
+        check_change_events_subscriptions(test_client)
+    finally:
+        del app.dependency_overrides[get_websocket_employee]
+
+
+def check_change_events_subscriptions(test_client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with test_client.websocket_connect(
+            "/changes/ws?topics=task:1"
+        ) as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 1008
+
+    employee = f"employee:{uuid4()}"
+    with test_client.websocket_connect(
+        "/changes/ws?topics=department:1"
+    ) as websocket:
+        websocket.send_json({"subscribe": [employee.upper()]})
+        assert websocket.receive_json() == {
+            "topics": ["department:1", employee]
+        }
+        websocket.send_json({"unsubscribe": ["department:1"]})
+        assert websocket.receive_json() == {"topics": [employee]}
+        websocket.send_json({"subscribe": "department:2"})
+        assert websocket.receive_json() == {"error": "Invalid topic"}
+        assert websocket.receive_json() == {"topics": [employee]}
+        assert test_client.get("/broadcast-stats").json()["connections"] == 1
+
+
+def test_change_events_are_scoped_to_the_caller(test_client, fake_session):
+    for path in ("/changes/ws", "/changes/ws?token=invalid"):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with test_client.websocket_connect(path):
+                pass
+        assert closed.value.code == 1008
+
+    employee_id = uuid4()
+    app.dependency_overrides[get_websocket_employee] = lambda: {
+        "id": employee_id,
+        "role": "employee",
+        "username": "e1",
+    }
+    fake_session.scalar.return_value = 3
+    try:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with test_client.websocket_connect(
+                "/changes/ws?topics=department:1"
+            ) as websocket:
+                websocket.receive_text()
+        assert closed.value.code == 1008
+
+        with test_client.websocket_connect(
+            f"/changes/ws?topics=employee:{employee_id}"
+        ) as websocket:
+            websocket.send_json({"subscribe": [f"employee:{uuid4()}"]})
+            assert websocket.receive_json() == {
+                "error": "Insufficient permissions"
+            }
+            assert websocket.receive_json() == {
+                "topics": [f"employee:{employee_id}"]
+            }
+            websocket.send_json({"subscribe": ["department:3"]})
+            assert websocket.receive_json() == {
+                "topics": ["department:3", f"employee:{employee_id}"]
+            }
+    finally:
+        del app.dependency_overrides[get_websocket_employee]
+        fake_session.scalar.return_value = None
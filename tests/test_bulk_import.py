@@ -0,0 +1,43 @@
+import io
+
+from src.emgmt.bulk_import import _validate, detect_format, read_rows
+
+
+def test_read_rows_csv_and_jsonl():
+    csv_file = io.BytesIO(
+        b"name,username,email,salary,age\n"
+        b"E1,e1,e1@xyz.com,1000,\n"
+        b"E2,e2,not-an-email,,30\n"
+    )
+    rows = list(read_rows(csv_file, "csv"))
+    assert [line for line, _ in rows] == [2, 3]
+    assert "age" not in rows[0][1]
+
+    employee, error = _validate(rows[0][1])
+    assert error is None and employee.age is None
+    employee, error = _validate(rows[1][1])
+    assert employee is None and error.startswith("email:")
+    assert "salary" not in error
+
+    jsonl_file = io.BytesIO(
+        b'{"name": "E1", "username": "e1", "email": "e1@xyz.com", '
+        b'"salary": null}\n\n[1, 2]\n'
+    )
+    rows = list(read_rows(jsonl_file, "jsonl"))
+    assert [line for line, _ in rows] == [1, 3]
+    assert _validate(rows[0][1])[1] is None
+    assert _validate(rows[1][1]) == (None, "Row is not a JSON object.")
+
+    assert detect_format("people.NDJSON") == "jsonl"
+
+
+def test_blank_or_missing_optional_cells_are_none():
+    for header, row in (
+        (b"name,username,email,salary", b"E1,e1,e1@xyz.com,"),
+        (b"name,username,email,department_id", b"E1,e1,e1@xyz.com,"),
+    ):
+        csv_file = io.BytesIO(header + b"\n" + row + b"\n")
+        [(_, row)] = read_rows(csv_file, "csv")
+        employee, error = _validate(row)
+        assert error is None
+        assert employee.salary is None and employee.department_id is None
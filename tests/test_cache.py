@@ -0,0 +1,141 @@
+import asyncio
+from unittest.mock import patch
+from uuid import uuid4
+
+import fakeredis
+from starlette.requests import Request
+
+from src.emgmt.cache import (
+    PrincipalCache,
+    ResponseCache,
+    TTLCache,
+    VersionedCache,
+)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=10)
+    with patch("src.emgmt.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("src.emgmt.cache.time.monotonic", return_value=109.0):
+        assert cache.get("a") == 1
+    with patch("src.emgmt.cache.time.monotonic", return_value=111.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def make_request(query: str, etag: str | None = None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/employees/",
+            "query_string": query.encode(),
+            "headers": headers,
+        }
+    )
+
+
+def test_response_cache_etags_and_invalidation():
+    versioned = VersionedCache(
+        fakeredis.FakeAsyncRedis(decode_responses=True), "test", ttl=60
+    )
+    cache = ResponseCache(versioned)
+
+    async def scenario():
+        miss, version = await cache.get(make_request("limit=2&offset=0"))
+        assert miss is None
+        stored = await cache.set(
+            make_request("limit=2&offset=0"),
+            b"[]",
+            {"X-Next-Cursor": "c"},
+            version,
+        )
+        etag = stored.headers["etag"]
+
+        # Query parameter order does not matter
+        hit, _ = await cache.get(make_request("offset=0&limit=2"))
+        assert hit.status_code == 200
+        assert hit.body == b"[]"
+        assert hit.headers["x-next-cursor"] == "c"
+        assert hit.headers["etag"] == etag
+
+        not_modified, _ = await cache.get(
+            make_request("limit=2&offset=0", etag)
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
+
+        await cache.invalidate()
+        miss, _ = await cache.get(make_request("limit=2&offset=0"))
+        assert miss is None
+
+    asyncio.run(scenario())
+    assert versioned.stats() == {"hits": 2, "misses": 2}
+
+
+def test_versioned_cache_drops_values_read_before_invalidation():
+    cache = VersionedCache(
+        fakeredis.FakeAsyncRedis(decode_responses=True), "test", ttl=60
+    )
+
+    async def scenario():
+        value, version = await cache.get("page")
+        assert value is None
+        # An employee write lands while the page is being rendered.
+        await cache.invalidate()
+        await cache.set("page", "stale", version)
+        assert (await cache.get("page"))[0] is None
+
+        _, version = await cache.get("page")
+        await cache.set("page", "fresh", version)
+        assert (await cache.get("page"))[0] == "fresh"
+
+    asyncio.run(scenario())
+
+
+def test_principal_cache_skips_stale_writes_and_bad_messages():
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    cache = PrincipalCache(redis, maxsize=10, ttl=60)
+    employee_id = uuid4()
+    principal = {"id": employee_id, "role": "employee", "username": "a"}
+
+    async def scenario():
+        cache.start()
+        while not cache.subscribed:
+            await asyncio.sleep(0.01)
+
+        # Read from the database before an update that invalidates it
+        generation = await cache.generation(employee_id)
+        await cache.invalidate(employee_id)
+        await cache.set(principal, generation)
+        assert await cache.get(employee_id) is None
+
+        await cache.set(principal, await cache.generation(employee_id))
+        assert await cache.get(employee_id) == principal
+        assert employee_id in cache.local._entries
+
+        # A malformed message does not stop the listener.
+        await redis.publish(cache.channel, "not-a-uuid")
+        await redis.publish(cache.channel, str(employee_id))
+        for _ in range(100):
+            if employee_id not in cache.local._entries:
+                break
+            await asyncio.sleep(0.01)
+        assert employee_id not in cache.local._entries
+        assert cache.subscribed
+        await cache.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from src.emgmt.change_feed import ChangeEvent, ChangeFeed, ChangeFeedLagged
+from src.emgmt.main import app
+from src.emgmt.routers.auth import get_websocket_employee
+
+
+def test_feed_skips_replays_and_reports_lagging_subscribers():
+    async def scenario():
+        feed = ChangeFeed("postgresql://unused")
+        employee_id = str(uuid4())
+        fast = feed.subscribe(maxsize=10)
+        slow = feed.subscribe(maxsize=2)
+
+        for seq in (1, 2, 2, 1):
+            feed.publish(
+                ChangeEvent.from_payload(
+                    [seq, "employee", "update", employee_id, employee_id, [3]]
+                )
+            )
+        assert feed.last_seq == 2
+        assert [(await anext(fast)).seq for _ in range(2)] == [1, 2]
+        assert fast.queue.empty()
+
+        feed.publish(
+            ChangeEvent.from_payload(
+                [3, "department", "insert", "4", None, [4]]
+            )
+        )
+        change = await anext(fast)
+        assert change.as_dict() == {
+            "seq": 3,
+            "entity": "department",
+            "action": "insert",
+            "id": "4",
+            "employee_id": None,
+            "department_ids": [4],
+        }
+        # The slow subscriber never read and was dropped on the third event.
+        assert feed.stats()["subscribers"] == 1
+        with pytest.raises(ChangeFeedLagged) as lagged:
+            await anext(slow)
+        assert lagged.value.last_seq is None
+
+    asyncio.run(scenario())
+
+
+def test_feed_websocket_is_admin_only(test_client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with test_client.websocket_connect("/changes/feed"):
+            pass
+    assert closed.value.code == 1008
+
+    app.dependency_overrides[get_websocket_employee] = lambda: {
+        "id": uuid4(),
+        "role": "employee",
+        "username": "e1",
+    }
+    try:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with test_client.websocket_connect("/changes/feed?since=0"):
+                pass
+    finally:
+        del app.dependency_overrides[get_websocket_employee]
+    assert closed.value.code == 1008
+    assert closed.value.reason == "Insufficient permissions"
@@ -0,0 +1,63 @@
+from decimal import Decimal
+import gzip
+from uuid import UUID
+
+import pytest
+
+from src.emgmt.export import ExportStream, RowWriter, build_export_query
+
+
+def test_build_export_query_selects_and_filters():
+    statement = build_export_query(
+        "Employee", ["id", "name"], ["age>=30", "department_id=null"]
+    )
+    compiled = str(statement.compile(compile_kwargs={"literal_binds": True}))
+    assert list(statement.selected_columns.keys()) == ["id", "name"]
+    assert "employee.age >= 30" in compiled
+    assert "employee.department_id IS NULL" in compiled
+    assert compiled.endswith("ORDER BY employee.id")
+
+    assert (
+        "hashed_password"
+        not in build_export_query("employee")
+        .compile(compile_kwargs={"literal_binds": True})
+        .string
+    )
+    with pytest.raises(ValueError):
+        build_export_query("employee", ["hashed_password"])
+    with pytest.raises(ValueError):
+        build_export_query("task", filters=["completed=maybe"])
+
+
+def test_row_writer_formats():
+    row = (UUID(int=1), "A, B", Decimal("10.50"), None)
+    keys = ["id", "name", "salary", "age"]
+
+    csv_writer = RowWriter(keys, "csv")
+    assert csv_writer.header() == "id,name,salary,age\n"
+    assert csv_writer.format(row) == (
+        '00000000-0000-0000-0000-000000000001,"A, B",10.50,\n'
+    )
+
+    jsonl_writer = RowWriter(keys, "jsonl")
+    assert jsonl_writer.header() == ""
+    assert jsonl_writer.format(row) == (
+        '{"id": "00000000-0000-0000-0000-000000000001", "name": "A, B", '
+        '"salary": "10.50", "age": null}\n'
+    )
+
+
+def test_export_stream_chunks_and_compresses():
+    writer = RowWriter(["id", "name"], "csv")
+    rows = [(i, f"name{i}") for i in range(100)]
+
+    stream = ExportStream(writer, compress=False, chunk_size=256)
+    chunks = [stream.feed(row) for row in rows]
+    assert any(chunk is None for chunk in chunks)
+    body = b"".join(filter(None, chunks)) + stream.finish()
+    assert body.decode().splitlines()[:2] == ["id,name", "0,name0"]
+
+    stream = ExportStream(writer, compress=True, chunk_size=256)
+    chunks = [stream.feed(row) for row in rows]
+    compressed = b"".join(filter(None, chunks)) + stream.finish()
+    assert gzip.decompress(compressed) == body
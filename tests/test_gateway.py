@@ -0,0 +1,102 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from unittest.mock import patch
+
+from httpx import AsyncClient
+import pytest
+
+from src.emgmt.gateway import CircuitBreaker, HTTPGateway, UpstreamUnavailable
+
+
+class StubUpstream(ThreadingHTTPServer):
+    """Local stand-in for the users API that counts its requests."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.requests = 0
+        self.status = 200
+        self.delay = 0.0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/users"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        body = json.dumps([{"id": self.server.requests}]).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = StubUpstream()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_gateway_coalesces_caches_and_breaks(upstream):
+    clock = [1000.0]
+
+    async def scenario():
+        async with AsyncClient() as client:
+            gateway = HTTPGateway(
+                client,
+                ttl=10,
+                stale_ttl=20,
+                breaker=CircuitBreaker(threshold=1, reset_timeout=5),
+            )
+            # Concurrent identical requests share one upstream call.
+            upstream.delay = 0.2
+            results = await asyncio.gather(
+                *(gateway.get_json(upstream.url) for _ in range(10))
+            )
+            assert results == [[{"id": 1}]] * 10
+            assert upstream.requests == 1
+            upstream.delay = 0
+
+            clock[0] += 5
+            assert await gateway.get_json(upstream.url) == [{"id": 1}]
+            assert upstream.requests == 1
+
+            # Stale: served at once while the refresh runs in the background.
+            clock[0] += 10
+            assert await gateway.get_json(upstream.url) == [{"id": 1}]
+            await asyncio.gather(*gateway._inflight.values())
+            assert await gateway.get_json(upstream.url) == [{"id": 2}]
+
+            # Expired and failing: the old response is served, and the open
+            # circuit keeps further calls off the upstream.
+            upstream.status = 500
+            clock[0] += 60
+            assert await gateway.get_json(upstream.url) == [{"id": 2}]
+            assert gateway.breaker.state == "open"
+            await gateway.get_json(upstream.url)
+            assert upstream.requests == 3
+            with pytest.raises(UpstreamUnavailable):
+                await gateway.get_json(upstream.url + "?page=2")
+
+            # After the reset timeout a trial call closes it again.
+            upstream.status = 200
+            clock[0] += 5
+            assert await gateway.get_json(upstream.url) == [{"id": 4}]
+            assert gateway.breaker.state == "closed"
+            assert gateway.stats()["coalesced"] == 9
+
+    with patch("src.emgmt.gateway.time.monotonic", lambda: clock[0]):
+        asyncio.run(scenario())
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import fakeredis
+
+from src.emgmt.models import Notification
+from src.emgmt.notifications import RateLimiter, deliver_claimed
+
+
+def make_row(id, recipient, message="hello", attempts=0):
+    return SimpleNamespace(
+        id=id,
+        recipient=recipient,
+        message=message,
+        attempts=attempts,
+        last_error=None,
+    )
+
+
+def test_deliveries_are_coalesced_rate_limited_and_retried(monkeypatch):
+    monkeypatch.setattr(
+        "src.emgmt.notifications.settings.NOTIFICATION_MAX_ATTEMPTS", 3
+    )
+    monkeypatch.setattr(
+        "src.emgmt.notifications.settings.NOTIFICATION_RETRY_DELAY", 10
+    )
+    limiter = RateLimiter(fakeredis.FakeRedis(), limit=1, window=60)
+    now = datetime(2026, 1, 1, 12, 0, 30, tzinfo=timezone.utc)
+    sent = []
+
+    def send(recipient, messages):
+        if recipient == "down@example.com":
+            raise ConnectionError("unreachable")
+        sent.append((recipient, messages))
+
+    rows = [
+        make_row(1, "a@example.com"),
+        make_row(2, "down@example.com", attempts=1),
+        make_row(3, "a@example.com"),
+        make_row(4, "a@example.com", "bye"),
+        make_row(5, "down@example.com", attempts=2),
+    ]
+    delivered, changes, stats = deliver_claimed(rows, limiter, send, now)
+    assert sent == [("a@example.com", ["hello", "bye"])]
+    assert delivered == [1, 3, 4]
+    assert [
+        (c["b_id"], c["b_status"], c["b_attempts"], c["b_available_at"])
+        for c in changes
+    ] == [
+        (2, "pending", 2, now + timedelta(seconds=20)),
+        (5, "failed", 3, now + timedelta(seconds=40)),
+    ]
+    assert (stats.claimed, stats.sent, stats.retried, stats.failed) == (
+        5,
+        1,
+        1,
+        1,
+    )
+
+    # A second delivery to the same recipient waits for the next window.
+    delivered, changes, stats = deliver_claimed(
+        [make_row(6, "a@example.com")], limiter, send, now
+    )
+    assert delivered == [] and stats.deferred == 1
+    assert changes[0]["b_status"] == "pending"
+    assert changes[0]["b_available_at"] == now + timedelta(seconds=30)
+
+
+def test_send_notification_writes_to_the_outbox(test_client, fake_session):
+    fake_session.add.reset_mock()
+    fake_session.commit.reset_mock()
+    response = test_client.post("/send-notification/a@example.com")
+    assert response.status_code == 200
+    (notification,), _ = fake_session.add.call_args
+    assert isinstance(notification, Notification)
+    assert notification.recipient == "a@example.com"
+    fake_session.commit.assert_awaited_once()
@@ -0,0 +1,371 @@
+"""Query plan checks for the queries the routers and CLI send.
+
+Run with ``pytest --query-plans`` against a disposable Postgres (the
+``POSTGRES_*`` settings). The tables are created and seeded in a scratch
+``query_plans`` schema that is dropped afterwards. Each scenario drives the
+real endpoints or commands with the sync engine, and every statement they
+send is EXPLAINed on the same connection just before it runs. A scenario
+fails when a plan seq scans one of the large tables or costs more than its
+budget.
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from typer.testing import CliRunner
+
+from src.emgmt import cache
+from src.emgmt.cli import employees as employees_cli
+from src.emgmt.cli import table_to_json as export_cli
+from src.emgmt.cli import tasks as tasks_cli
+from src.emgmt.config import settings
+from src.emgmt.database import (
+    SessionLocal,
+    ThreadedSession,
+    engine,
+    get_async_db,
+)
+from src.emgmt.main import app
+from src.emgmt.models import Base, Employee
+from src.emgmt.utils import (
+    check_unique_field,
+    create_access_token,
+    hash_password,
+)
+
+pytestmark = pytest.mark.query_plans
+
+SCHEMA = "query_plans"
+
+DEPARTMENTS = 500
+EMPLOYEES = 100_000
+TASKS = 500_000
+
+# Tables big enough that a seq scan on them is always a regression
+LARGE_TABLES = {"employee", "task"}
+
+# Planner cost units, compared with the total cost of each statement
+DEFAULT_COST_BUDGET = 10_000
+
+SEED = [
+    """
+    INSERT INTO department (name, location, date_formed)
+    SELECT 'Department ' || i, 'City ' || i % 50, date '2000-01-01' + i
+    FROM generate_series(1, :departments) AS i
+    """,
+    """
+    INSERT INTO employee (
+        id, name, age, username, email, role, salary, department_id
+    )
+    SELECT
+        gen_random_uuid(), 'Employee ' || md5(i::text), 18 + i % 43,
+        'user' || i, 'user' || i || '@example.com', 'employee',
+        1000 + i % 9000, 1 + i % :departments
+    FROM generate_series(1, :employees) AS i
+    """,
+    """
+    WITH numbered AS (
+        SELECT id, row_number() OVER (ORDER BY id) AS n FROM employee
+    )
+    INSERT INTO task (title, description, completed, employee_id)
+    SELECT 'Task ' || i, 'Seeded task', i % 4 <> 0, numbered.id
+    FROM generate_series(1, :tasks) AS i
+    JOIN numbered ON numbered.n = 1 + i % :employees
+    """,
+]
+
+EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.I)
+
+
+class PlanRecorder:
+    """EXPLAINs each statement on its own connection before it runs."""
+
+    def __init__(self):
+        self.plans: list[tuple[str, dict]] = []
+
+    def __call__(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        if not EXPLAINABLE.match(statement):
+            return
+        if executemany:
+            parameters = parameters[0]
+        # A savepoint keeps a failed EXPLAIN from aborting the transaction.
+        explain = conn.connection.driver_connection.cursor()
+        try:
+            explain.execute("SAVEPOINT query_plan")
+            explain.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            self.plans.append((statement, explain.fetchone()[0][0]["Plan"]))
+            explain.execute("RELEASE SAVEPOINT query_plan")
+        except Exception:
+            explain.execute("ROLLBACK TO SAVEPOINT query_plan")
+            raise
+        finally:
+            explain.close()
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def set_search_path(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET search_path TO {SCHEMA}, public")
+    cursor.close()
+    dbapi_connection.commit()
+
+
+@pytest.fixture(scope="module")
+def seeded_db():
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    event.listen(engine, "connect", set_search_path)
+    engine.dispose()
+    try:
+        with engine.begin() as connection:
+            Base.metadata.create_all(connection)
+            for statement in SEED:
+                connection.execute(
+                    text(statement),
+                    {
+                        "departments": DEPARTMENTS,
+                        "employees": EMPLOYEES,
+                        "tasks": TASKS,
+                    },
+                )
+            admin_id = connection.execute(
+                text("""
+                    INSERT INTO employee (
+                        id, name, username, email, hashed_password, role
+                    )
+                    VALUES (
+                        gen_random_uuid(), 'Admin', 'admin',
+                        'admin@example.com', :hashed_password, 'admin'
+                    )
+                    RETURNING id
+                    """),
+                {"hashed_password": hash_password(settings.ADMIN_PASSWORD)},
+            ).scalar_one()
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            # VACUUM flushes the GIN pending lists filled by the seed, which
+            # would otherwise make the trigram indexes look too costly.
+            connection.execute(text("VACUUM ANALYZE"))
+        yield admin_id
+    finally:
+        event.remove(engine, "connect", set_search_path)
+        engine.dispose()
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+@pytest.fixture
+def client(seeded_db, monkeypatch):
+    # Route every request to the sync engine, where statements are recorded,
+    # and make the Redis caches miss so every query reaches Postgres.
+    monkeypatch.setattr(settings, "DB_ASYNC", False)
+    monkeypatch.delitem(app.dependency_overrides, get_async_db)
+
+    async def miss(*args, **kwargs):
+        return None
+
+    async def versioned_miss(*args, **kwargs):
+        return None, None
+
+    monkeypatch.setattr(cache.PrincipalCache, "get", miss)
+    monkeypatch.setattr(cache.VersionedCache, "get", versioned_miss)
+    client = TestClient(app)
+    token = create_access_token({"id": str(seeded_db), "username": "admin"})
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
+
+
+@pytest.fixture
+def sample(seeded_db):
+    with engine.connect() as connection:
+        return connection.execute(text("""
+                SELECT e.id, e.username, e.department_id, e.email,
+                       min(t.id) AS task_id
+                FROM employee AS e JOIN task AS t ON t.employee_id = e.id
+                WHERE e.username = 'user4242'
+                GROUP BY e.id
+                """)).one()
+
+
+def next_page(client, url, **params):
+    first = client.get(url, params=params)
+    assert first.status_code == 200, first.text
+    params["cursor"] = first.headers["X-Next-Cursor"]
+    return client.get(url, params=params)
+
+
+def run_cli(app, *args, input=None):
+    result = CliRunner().invoke(app, list(args), input=input)
+    assert result.exit_code == 0, result.output
+
+
+def add_and_update_employee(client, sample, tmp_path):
+    response = client.post(
+        "/employees/",
+        json={
+            "name": "New",
+            "username": "new-employee",
+            "email": "new-employee@example.com",
+            "salary": "1000",
+            "department_id": sample.department_id,
+            "password": "secret",
+        },
+    )
+    assert response.status_code == 200, response.text
+    return client.patch(
+        f"/employees/{response.json()['id']}", json={"salary": "1100"}
+    )
+
+
+def check_unique_email(client, sample, tmp_path):
+    asyncio.run(
+        check_unique_field(
+            ThreadedSession(SessionLocal()), Employee, "email", "x@example.com"
+        )
+    )
+
+
+def cli_batch(client, sample, tmp_path):
+    operations = [
+        {"op": "add", "username": sample.username, "title": "New"},
+        {
+            "op": "update",
+            "username": sample.username,
+            "task_id": sample.task_id,
+            "description": "Updated",
+        },
+        {
+            "op": "complete",
+            "username": sample.username,
+            "task_id": sample.task_id,
+        },
+    ]
+    run_cli(
+        tasks_cli.app,
+        "batch",
+        "-",
+        "--format",
+        "jsonl",
+        input="\n".join(map(json.dumps, operations)),
+    )
+
+
+def cli_employee_import(client, sample, tmp_path):
+    path = tmp_path / "employees.csv"
+    path.write_text(
+        "name,username,email,department_id\n"
+        f"Imported,imported,imported@example.com,{sample.department_id}\n"
+        f"Duplicate,{sample.username},{sample.email},{sample.department_id}\n"
+    )
+    run_cli(employees_cli.app, str(path))
+
+
+SCENARIOS = {
+    "employee listing": lambda c, s, t: next_page(c, "/employees/", limit=100),
+    "employee listing by name": lambda c, s, t: next_page(
+        c, "/employees/", limit=100, order_by="name"
+    ),
+    "department listing": lambda c, s, t: next_page(
+        c, "/departments/", limit=100, order_by="name"
+    ),
+    "employee detail": lambda c, s, t: c.get(
+        f"/employees/{s.id}", params={"tasks_limit": 2}
+    ),
+    "department detail": lambda c, s, t: c.get(
+        f"/departments/{s.department_id}"
+    ),
+    "department summary": lambda c, s, t: c.get(
+        f"/departments/{s.department_id}/summary"
+    ),
+    "search by name prefix": lambda c, s, t: c.get(
+        "/employees/search", params={"q": "Employee a1", "match": "prefix"}
+    ),
+    "search by email substring": lambda c, s, t: c.get(
+        "/employees/search",
+        params={"q": "4242@exa", "match": "substring", "order_by": "name"},
+    ),
+    "search by department and salary": lambda c, s, t: c.get(
+        "/employees/search",
+        params={
+            "department_id": s.department_id,
+            "min_salary": 2000,
+            "max_salary": 3000,
+            "order_by": "salary",
+        },
+    ),
+    "open tasks of an employee": lambda c, s, t: c.get(
+        "/tasks/", params={"employee_id": s.id, "completed": False}
+    ),
+    "task listing": lambda c, s, t: next_page(c, "/tasks/", limit=100),
+    "index page": lambda c, s, t: c.get("/", params={"limit": 50}),
+    "login": lambda c, s, t: c.post(
+        "/auth/",
+        data={"username": "admin", "password": settings.ADMIN_PASSWORD},
+    ),
+    "add and update employee": add_and_update_employee,
+    "check_unique_field": check_unique_email,
+    "export an employee's tasks": lambda c, s, t: c.get(
+        "/export/task", params={"filter": f"employee_id={s.id}"}
+    ),
+    "cli view-tasks": lambda c, s, t: run_cli(
+        tasks_cli.app, "view-tasks", s.username, "--open"
+    ),
+    "cli batch": cli_batch,
+    "cli employee import": cli_employee_import,
+    "cli export by department": lambda c, s, t: run_cli(
+        export_cli.app,
+        "employee",
+        "--filter",
+        f"department_id={s.department_id}",
+        "-o",
+        str(t / "employees.jsonl"),
+    ),
+}
+
+# Scenarios that legitimately read a large table in full
+ALLOWED_SEQ_SCANS: dict[str, set[str]] = {}
+
+COST_BUDGETS: dict[str, float] = {}
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_query_plans(scenario, client, sample, tmp_path):
+    recorder = PlanRecorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+    try:
+        response = SCENARIOS[scenario](client, sample, tmp_path)
+        if response is not None:
+            assert response.status_code < 400, response.text
+    finally:
+        event.remove(engine, "before_cursor_execute", recorder)
+
+    assert recorder.plans, "no statements were recorded"
+    budget = COST_BUDGETS.get(scenario, DEFAULT_COST_BUDGET)
+    allowed = ALLOWED_SEQ_SCANS.get(scenario, set())
+    for statement, plan in recorder.plans:
+        seq_scans = {
+            node["Relation Name"]
+            for node in plan_nodes(plan)
+            if node["Node Type"] == "Seq Scan"
+        }
+        regressions = (seq_scans & LARGE_TABLES) - allowed
+        assert (
+            not regressions
+        ), f"Seq scan on {', '.join(sorted(regressions))}:\n{statement}"
+        assert (
+            plan["Total Cost"] <= budget
+        ), f"Cost {plan['Total Cost']} over {budget}:\n{statement}"
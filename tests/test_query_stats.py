@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from src.emgmt import query_stats
+from src.emgmt.query_stats import instrument, normalize_sql, track_queries
+
+
+def test_normalize_sql_groups_statements_by_shape():
+    assert (
+        normalize_sql(
+            "SELECT *  FROM employee\n WHERE name = 'O''Brien' AND id IN "
+            "(%(id_1)s, %(id_2)s) LIMIT 50"
+        )
+        == "SELECT * FROM employee WHERE name = ? AND id IN (...) LIMIT ?"
+    )
+    assert normalize_sql("SELECT ix_1 FROM t WHERE a = $1") == (
+        "SELECT ix_1 FROM t WHERE a = ?"
+    )
+
+
+def scripted_clock(*durations_ms):
+    """A perf_counter under which the statements take ``durations_ms``."""
+    ticks, now = [], 0.0
+    for duration in durations_ms:
+        ticks += [now, now + duration / 1000]
+        now += duration / 1000
+    return SimpleNamespace(perf_counter=iter(ticks).__next__)
+
+
+def test_request_reports_queries_and_repeated_statements(monkeypatch, caplog):
+    monkeypatch.setattr(query_stats, "time", scripted_clock(1, 1, 1, 1, 50, 1))
+    monkeypatch.setattr(query_stats.settings, "SQL_DEBUG_HEADERS", True)
+    monkeypatch.setattr(query_stats.settings, "N_PLUS_ONE_THRESHOLD", 3)
+    monkeypatch.setattr(query_stats.settings, "SLOW_QUERY_MS", 10_000)
+    db_engine = create_engine("sqlite://")
+    instrument(db_engine)
+    app = FastAPI()
+    app.middleware("http")(track_queries)
+
+    @app.get("/items")
+    def items():
+        with db_engine.connect() as connection:
+            for i in range(4):
+                connection.execute(text(f"SELECT {i}"))
+            connection.execute(text("SELECT 'x' AS name"))
+        return {}
+
+    response = TestClient(app).get("/items")
+    assert response.headers["X-DB-Query-Count"] == "5"
+    assert response.headers["X-DB-Repeated-Queries"] == "4"
+    assert response.headers["X-DB-Time"] == "54.000ms"
+    assert response.headers["X-DB-Slowest"] == "50.000ms SELECT ? AS name"
+    assert '"event": "repeated_query"' in caplog.text
+    assert '"request": "GET /items"' in caplog.text
+
+    # Outside a request only slow statements are logged.
+    monkeypatch.setattr(query_stats.settings, "SLOW_QUERY_MS", 0)
+    with db_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert '"event": "slow_query"' in caplog.text
@@ -1,7 +1,21 @@
 from decimal import Decimal
+import os
+from types import SimpleNamespace
 from unittest.mock import Mock
 from uuid import uuid4
 
+from prometheus_client import REGISTRY
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from typer.testing import CliRunner
+
+from src.emgmt import metrics
+from src.emgmt.cli.metrics import app as metrics_cli
+from src.emgmt.cli.tasks import app as tasks_cli
+from src.emgmt.main import app
+from src.emgmt.routers.auth import get_authenticated_employee, require_admin
+
 # from tests.testconf import test_client, fake_session
 
 
@@ -83,3 +97,403 @@ def test_display_employees(test_client, fake_session):
     assert len(data) == 5
     assert data[2]["name"] == "E3"
     assert Decimal(data[4]["salary"]) == Decimal("5000")
+
+
+def test_metrics_histogram_per_route_template(test_client):
+    employee_id = uuid4()
+    test_client.get("/get_headers")
+    test_client.get(f"/employees/{employee_id}")
+    assert "X-Process-Time" in test_client.get("/no/such/page").headers
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    for route, status in (
+        ("/get_headers", 200),
+        ("/employees/{employee_id}", 401),
+        ("unmatched", 404),
+    ):
+        assert (
+            "http_request_duration_seconds_count"
+            f'{{method="GET",route="{route}",status="{status}"}}'
+        ) in body
+    assert str(employee_id) not in body
+    assert 'db_pool_connections{engine="async",state="idle"}' in body
+    assert 'http_requests_in_progress{method="GET"} 1.0' in body
+
+
+def test_pool_counters_advance_by_the_sampled_difference():
+    def checkouts():
+        return REGISTRY.get_sample_value(
+            "db_pool_checkouts_total", {"engine": "test"}
+        )
+
+    metrics.advance(metrics.DB_POOL_CHECKOUTS, "test", 3)
+    metrics.advance(metrics.DB_POOL_CHECKOUTS, "test", 5)
+    assert checkouts() == 5
+    # The pool was disposed and counts from zero again.
+    metrics.advance(metrics.DB_POOL_CHECKOUTS, "test", 2)
+    assert checkouts() == 7
+
+
+def test_multiprocess_samples_are_cleaned_up(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    live = tmp_path / f"gauge_livesum_{os.getpid()}.db"
+    counter = tmp_path / "counter_1.db"
+    live.touch()
+    counter.touch()
+
+    metrics.shutdown()
+    assert not live.exists() and counter.exists()
+
+    result = CliRunner().invoke(metrics_cli)
+    assert result.exit_code == 0, result.output
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_db_pool_status(test_client):
+    response = test_client.get("/db-pool")
+    assert response.status_code == 200
+    data = response.json()
+    # Other tests may have used the pools; reading the status does not.
+    assert test_client.get("/db-pool").json() == data
+    for name in ("async", "sync"):
+        assert data[name]["checked_out"] == 0
+        assert data[name]["overflow"] == 0
+
+
+def test_display_departments_keyset_cursor(test_client, fake_session):
+    fake_departments = [
+        {"id": 1, "name": "D1", "location": "L1", "date_formed": None},
+        {"id": 2, "name": "D2", "location": "L2", "date_formed": None},
+    ]
+    mock_execute = Mock()
+    mock_execute.scalars.return_value.all.return_value = [
+        SimpleNamespace(**department) for department in fake_departments
+    ]
+    fake_session.execute.return_value = mock_execute
+
+    response = test_client.get("/departments/?limit=2&order_by=name")
+    assert response.status_code == 200
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = test_client.get(
+        f"/departments/?limit=2&order_by=name&cursor={cursor}"
+    )
+    assert response.status_code == 200
+    statement = fake_session.execute.call_args.args[0]
+    compiled = statement.compile(compile_kwargs={"literal_binds": True})
+    assert "(department.name, department.id) > ('D2', 2)" in str(compiled)
+
+    response = test_client.get(f"/departments/?limit=2&cursor={cursor}")
+    assert response.status_code == 400
+
+    # An empty page has no last row to continue from.
+    for path in ("/departments/?limit=0", "/employees/?limit=0"):
+        assert test_client.get(path).status_code == 422
+
+
+def test_search_employees_builds_indexed_filters(test_client, fake_session):
+    app.dependency_overrides[require_admin] = lambda: uuid4()
+    mock_execute = Mock()
+    mock_execute.scalars.return_value.all.return_value = []
+    fake_session.execute.return_value = mock_execute
+    try:
+        response = test_client.get(
+            "/employees/search",
+            params={
+                "q": "50%_off",
+                "match": "prefix",
+                "department_id": 3,
+                "min_salary": "1000",
+                "order_by": "salary",
+                "descending": True,
+            },
+        )
+    finally:
+        del app.dependency_overrides[require_admin]
+
+    assert response.status_code == 200
+    statement = fake_session.execute.call_args.args[0]
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert compiled.params["name_1"] == "50\\%\\_off%"
+    compiled = str(
+        statement.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+    assert "employee.name ILIKE '50\\%%\\_off%%' ESCAPE '\\'" in compiled
+    assert "employee.department_id = 3" in compiled
+    assert "employee.salary >= 1000" in compiled
+    assert "ORDER BY employee.salary DESC NULLS LAST, employee.id" in compiled
+
+
+def test_department_summary_reads_materialized_row(test_client, fake_session):
+    app.dependency_overrides[require_admin] = lambda: uuid4()
+    mock_execute = Mock()
+    mock_execute.mappings.return_value.first.return_value = {
+        "department_id": 3,
+        "name": "D3",
+        "headcount": 2,
+        "average_age": Decimal("35.50"),
+        "salary_total": Decimal("3000.00"),
+        "salary_average": Decimal("1500.00"),
+        "salary_min": Decimal("1000.00"),
+        "salary_max": Decimal("2000.00"),
+        "open_tasks": 4,
+        "completed_tasks": 1,
+        "refreshed_at": None,
+    }
+    fake_session.execute.return_value = mock_execute
+    try:
+        response = test_client.get("/departments/3/summary")
+    finally:
+        del app.dependency_overrides[require_admin]
+
+    assert response.status_code == 200
+    assert response.json()["headcount"] == 2
+    compiled = str(
+        fake_session.execute.call_args.args[0].compile(
+            dialect=postgresql.dialect()
+        )
+    )
+    # Served from the summary table without touching employee or task
+    assert "LEFT OUTER JOIN department_summary" in compiled
+    assert "employee" not in compiled
+    assert "task" not in compiled.replace("_tasks", "")
+
+
+def test_add_employee_maps_constraint_violation(test_client, fake_session):
+    violation = IntegrityError(
+        "INSERT",
+        {},
+        SimpleNamespace(
+            diag=SimpleNamespace(constraint_name="employee_email_key")
+        ),
+    )
+    fake_session.execute.side_effect = violation
+    app.dependency_overrides[require_admin] = lambda: uuid4()
+    try:
+        response = test_client.post(
+            "/employees/",
+            json={
+                "name": "E1",
+                "username": "e1",
+                "email": "e1@xyz.com",
+                "salary": "1000",
+                "password": "secret",
+            },
+        )
+    finally:
+        del app.dependency_overrides[require_admin]
+        fake_session.execute.side_effect = None
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Email is already in use."
+    fake_session.rollback.assert_awaited()
+
+
+def test_get_employee_pages_tasks(test_client, fake_session):
+    employee_id = uuid4()
+    employee = SimpleNamespace(
+        id=employee_id,
+        name="E1",
+        age=30,
+        username="e1",
+        email="e1@xyz.com",
+        salary=Decimal("1000"),
+        department_id=1,
+        department=SimpleNamespace(
+            id=1, name="D1", location="L1", date_formed=None
+        ),
+    )
+    tasks = [
+        SimpleNamespace(
+            id=task_id,
+            title=f"T{task_id}",
+            description=None,
+            completed=False,
+            employee_id=employee_id,
+        )
+        for task_id in (1, 2)
+    ]
+    employee_result = Mock()
+    employee_result.first.return_value = (employee, 5)
+    tasks_result = Mock()
+    tasks_result.scalars.return_value.all.return_value = tasks
+    fake_session.execute.side_effect = [employee_result, tasks_result]
+    app.dependency_overrides[get_authenticated_employee] = lambda: {
+        "id": employee_id,
+        "role": "employee",
+        "username": "e1",
+    }
+    try:
+        response = test_client.get(f"/employees/{employee_id}?tasks_limit=2")
+        empty_pages = [
+            test_client.get(f"/employees/{employee_id}?tasks_limit=0"),
+            test_client.get("/departments/1?employees_limit=0"),
+        ]
+    finally:
+        del app.dependency_overrides[get_authenticated_employee]
+        fake_session.execute.side_effect = None
+
+    assert [page.status_code for page in empty_pages] == [422, 422]
+    assert response.status_code == 200
+    data = response.json()
+    assert data["department"]["name"] == "D1"
+    assert [task["id"] for task in data["tasks"]] == [1, 2]
+    assert data["task_count"] == 5
+    assert data["tasks_next_cursor"] is not None
+
+
+def test_index_renders_projected_page(test_client, fake_session):
+    rows = [
+        SimpleNamespace(id=uuid4(), name=f"E{i}", email=f"e{i}@xyz.com")
+        for i in (1, 2)
+    ]
+    fake_session.execute.return_value.all.return_value = rows
+
+    response = test_client.get("/?limit=2")
+    assert response.status_code == 200
+    assert "e2@xyz.com" in response.text
+    assert "cursor=" in response.text
+    statement = fake_session.execute.call_args.args[0]
+    assert [column.name for column in statement.selected_columns] == [
+        "id",
+        "name",
+        "email",
+    ]
+
+
+def test_upload_files_are_deduplicated(test_client, tmp_path, monkeypatch):
+    from src.emgmt.routers import upload_files
+    from src.emgmt.storage import ContentStore
+
+    store = ContentStore(tmp_path, chunk_size=4)
+    monkeypatch.setattr(upload_files, "content_store", store)
+    files = [
+        ("files", ("a.txt", b"same content", "text/plain")),
+        ("files", ("b.txt", b"same content", "text/plain")),
+        ("files", ("c.txt", b"other", "text/plain")),
+    ]
+    response = test_client.post("/files/multiple_files/", files=files)
+    assert response.status_code == 200
+    stored = response.json()["files"]
+    assert response.json()["filenames"] == ["a.txt", "b.txt", "c.txt"]
+    assert stored[0]["sha256"] == stored[1]["sha256"]
+    assert [f["deduplicated"] for f in stored].count(True) == 1
+    assert store.path_for(stored[0]["sha256"]).read_bytes() == b"same content"
+    assert not any((tmp_path / "incoming").iterdir())
+
+    monkeypatch.setattr(upload_files.settings, "UPLOAD_MAX_BYTES", 15)
+    response = test_client.post("/files/multiple_files/", files=files)
+    assert response.status_code == 413
+    assert not any((tmp_path / "incoming").iterdir())
+
+
+def test_concurrent_commits_claim_content_once(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+
+    from src.emgmt.storage import ContentStore
+
+    store = ContentStore(tmp_path, chunk_size=4)
+    temp_names = []
+    for _ in range(8):
+        out, name = store._open_temp()
+        with out:
+            out.write(b"same content")
+        temp_names.append(name)
+    barrier = threading.Barrier(len(temp_names))
+
+    def commit(name):
+        barrier.wait()
+        return store._commit(name, "ab" * 32)
+
+    with ThreadPoolExecutor(len(temp_names)) as pool:
+        deduplicated = list(pool.map(commit, temp_names))
+    assert deduplicated.count(False) == 1
+    assert store.path_for("ab" * 32).read_bytes() == b"same content"
+    assert not any((tmp_path / "incoming").iterdir())
+
+
+def test_get_job_and_events(test_client, monkeypatch):
+    import fakeredis
+    from starlette.websockets import WebSocketDisconnect
+
+    from src.emgmt.routers import jobs
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        jobs, "redis_client", fakeredis.FakeAsyncRedis(server=server)
+    )
+    monkeypatch.setattr(
+        jobs,
+        "read_job_status",
+        lambda job_id: {"job_id": str(job_id), "status": "SUCCESS"},
+    )
+    job_id = uuid4()
+    assert test_client.get(f"/jobs/{job_id}").status_code == 404
+    with test_client.websocket_connect(f"/jobs/{job_id}/events") as ws:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_json()
+        assert exc_info.value.code == 4404
+
+    fakeredis.FakeRedis(server=server).set(f"emgmt:job:{job_id}", "x")
+    assert test_client.get(f"/jobs/{job_id}").json()["status"] == "SUCCESS"
+    assert test_client.delete(f"/jobs/{job_id}").status_code == 409
+    # A finished job sends its final status and closes the socket
+    with test_client.websocket_connect(f"/jobs/{job_id}/events") as ws:
+        assert ws.receive_json()["status"] == "SUCCESS"
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+
+
+def test_display_tasks_filters_and_scopes_to_caller(test_client, fake_session):
+    employee_id = uuid4()
+    app.dependency_overrides[get_authenticated_employee] = lambda: {
+        "id": employee_id,
+        "role": "employee",
+        "username": "e1",
+    }
+    mock_execute = Mock()
+    mock_execute.scalars.return_value.all.return_value = [
+        SimpleNamespace(
+            id=7,
+            title="T",
+            description=None,
+            completed=False,
+            employee_id=employee_id,
+        )
+    ]
+    fake_session.execute.return_value = mock_execute
+    try:
+        response = test_client.get("/tasks/?completed=false&limit=1")
+        forbidden = test_client.get(f"/tasks/?employee_id={uuid4()}")
+        empty = test_client.get("/tasks/?limit=0")
+    finally:
+        del app.dependency_overrides[get_authenticated_employee]
+
+    assert empty.status_code == 422
+
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == 7
+    assert "X-Next-Cursor" in response.headers
+    compiled = str(
+        fake_session.execute.call_args.args[0].compile(
+            dialect=postgresql.dialect()
+        )
+    )
+    assert "task.employee_id = %(employee_id_1)s::UUID" in compiled
+    assert "NOT task.completed" in compiled
+    assert forbidden.status_code == 403
+
+
+def test_view_tasks_rejects_an_empty_page():
+    result = CliRunner().invoke(
+        tasks_cli, ["view-tasks", "e1", "--limit", "0"]
+    )
+    assert result.exit_code == 2
+    assert "Invalid username" not in result.output
@@ -0,0 +1,28 @@
+from src.emgmt.task_batch import _groups, _validate
+
+
+def test_validate_requires_fields_per_op():
+    operation, error = _validate({"op": "add", "username": "e1"})
+    assert operation is None
+    assert error == "Value error, title is required to add a task"
+
+    operation, error = _validate(
+        {"op": "update", "username": "e1", "task_id": "3", "completed": "y"}
+    )
+    assert error is None
+    assert operation.task_id == 3 and operation.completed is True
+
+    assert _validate({"op": "archive", "username": "e1"})[1].startswith("op:")
+
+
+def test_groups_keep_operations_on_a_task_in_file_order():
+    rows = [
+        {"op": "add", "username": "e1", "title": "t"},
+        {"op": "complete", "username": "e1", "task_id": 1},
+        {"op": "update", "username": "e1", "task_id": 2},
+        {"op": "delete", "username": "e1", "task_id": 1},
+        {"op": "add", "username": "e1", "title": "t"},
+    ]
+    operations = [(line, _validate(row)[0]) for line, row in enumerate(rows)]
+    groups = [[line for line, _ in group] for group in _groups(operations)]
+    assert groups == [[0, 1, 2], [3, 4]]
@@ -0,0 +1,23 @@
+from passlib.hash import pbkdf2_sha256
+
+from src.emgmt.utils import (
+    hash_password,
+    password_needs_rehash,
+    verify_and_update_password,
+)
+
+
+def test_verify_and_update_password_rehashes_stale_hash():
+    stale = pbkdf2_sha256.using(rounds=1000).hash("secret")
+    assert password_needs_rehash(stale)
+
+    valid, new_hash = verify_and_update_password("secret", stale)
+    assert valid
+    assert new_hash is not None
+    assert not password_needs_rehash(new_hash)
+
+    assert verify_and_update_password("wrong", stale) == (False, None)
+    assert verify_and_update_password("secret", hash_password("secret")) == (
+        True,
+        None,
+    )